@@ -0,0 +1,18 @@
+"""
+Shared worker threads for the diagnostic agents
+One pool per process, so diagnose() calls don't start fresh threads each time
+"""
+
+import atexit
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+SHARED_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='diag')
+atexit.register(SHARED_POOL.shutdown)
+
+
+async def run_in_pool(fn, *args, **kwargs):
+    """Like asyncio.to_thread, but on SHARED_POOL instead of the loop's own executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(SHARED_POOL, functools.partial(fn, *args, **kwargs))
@@ -4,329 +4,822 @@ Forces tool execution, uses Python logic for analysis
 ALL TOOLS DEFINED DIRECTLY IN THIS FILE - NO IMPORTS
 """
 
+import os
 import json
+import asyncio
+import re
 import time
+import socket
 import subprocess
+import threading
+from bisect import bisect_right
+from collections import Counter
 from datetime import datetime
 from typing import Dict
 
-# Diagnostic libraries
+# Diagnostic libraries (netifaces, icmplib) are imported inside the tools
+# that use them so importing this module stays cheap - a missing package
+# shows up as that tool's error instead.
+# Install with: pip install netifaces icmplib
+
+from _exec import run_in_pool
+
+# Optional: native Netlink access, avoids forking `arp` / `iwconfig`
 try:
-    import netifaces
-    from icmplib import ping as icmp_ping
-except ImportError as e:
-    print(f"Missing dependency: {e}")
-    print("Install with: pip install netifaces icmplib")
-    exit(1)
+    from pyroute2 import IPRoute
+    from pyroute2.iwutil import IW
+except ImportError:
+    IPRoute = IW = None
+
+# Optional: orjson is several times faster than stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ============================================================================
+# COMPILED PATTERNS - Built once at import, shared by every tool call
+# ============================================================================
+
+# One traceroute hop line: " 3  host (1.2.3.4)  12.345 ms" or " 4  *"
+_HOP_RE = re.compile(rb'^\s*(\d+)\s+(\S+)(?:\s+\(\S+\))?(?:\s+([\d.]+)\s*ms)?', re.M)
+
+# "Frequency:2.437 GHz" in `iwconfig <iface>` output
+_IWCONFIG_FREQ_RE = re.compile(rb'Frequency:(\d+(?:\.\d+)?) ?GHz')
+
+# Fields of interest in `iwlist <iface> scan` output
+_IWLIST_RE = re.compile(
+    rb'Cell \d+ - Address: (?P<cell>[0-9A-Fa-f:]+)'
+    rb'|ESSID:"(?P<ssid>[^"]*)"'
+    rb'|Channel:(?P<channel>\d+)'
+    rb'|Signal level=(?P<signal>-?\d+) ?dBm'
+)
+
+# /proc/net/arp row: IP address, HW type, Flags, HW address, Mask, Device
+_ARP_RE = re.compile(rb'^(\S+)\s+\S+\s+\S+\s+(\S+)\s+\S+\s+(\S+)$', re.M)
+
+
+# ============================================================================
+# JSON HELPERS - Only used at the output boundary
+# ============================================================================
+
+def save_json(data, path: str):
+    """Write data to path as indented JSON"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def load_json(path: str):
+    """Read a JSON document from path"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
 
 
 # ============================================================================
 # DIAGNOSTIC TOOLS - Defined directly in this file
 # ============================================================================
 
-def run_traceroute(target: str = "8.8.8.8", max_hops: int = 15) -> str:
+# Shared options for the short-lived tools we exec: a tiny fixed environment
+# (C locale keeps output stable for the patterns above) and no fd sweep
+_SUBPROC_KW = dict(
+    env={'PATH': '/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin', 'LC_ALL': 'C'},
+    close_fds=False
+)
+
+
+def _lookup_default_gateway():
+    """Return (gateway_ip, interface) for the IPv4 default route, or None."""
+    import netifaces
+    
+    gateways = netifaces.gateways()
+    return gateways.get('default', {}).get(netifaces.AF_INET)
+
+
+# Interface name -> number of down events seen by the netlink link watcher
+_link_down_counts = Counter()
+_link_watcher = None
+_link_watcher_lock = threading.Lock()
+_LINK_DOWN_STATES = ('DOWN', 'LOWERLAYERDOWN', 'NOTPRESENT')
+
+
+def _watch_links():
+    """Count interface-down events from one netlink subscription (daemon thread)."""
+    try:
+        with IPRoute() as ipr:
+            ipr.bind()  # RTM_NEWLINK/RTM_DELLINK broadcasts
+            while True:
+                for msg in ipr.get():
+                    event = msg.get('event')
+                    if event == 'RTM_DELLINK' or (
+                            event == 'RTM_NEWLINK' and msg.get_attr('IFLA_OPERSTATE') in _LINK_DOWN_STATES):
+                        _link_down_counts[msg.get_attr('IFLA_IFNAME')] += 1
+    except Exception:
+        pass  # no events - cached gateways still expire after their TTL
+
+
+def _link_down_count(ifname: str) -> int:
+    """Down events seen so far for ifname; starts the link watcher on first use (0 without pyroute2)."""
+    global _link_watcher
+    if IPRoute is None:
+        return 0
+    if _link_watcher is None:
+        with _link_watcher_lock:
+            if _link_watcher is None:
+                _link_watcher = threading.Thread(target=_watch_links, name='diag-links', daemon=True)
+                _link_watcher.start()
+    return _link_down_counts[ifname]
+
+
+def _traceroute_subprocess(target: str, max_hops: int) -> list:
+    """
+    Fallback traceroute using the system binary (no raw socket access needed)
+    Hops are parsed as they are printed and the run stops at the destination,
+    so unreachable tail hops never hold up the result
+    """
+    proc = subprocess.Popen(
+        ['traceroute', '-n', '-m', str(max_hops), '-w', '1', '-q', '1', target],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        **_SUBPROC_KW
+    )
+    watchdog = threading.Timer(30, proc.kill)
+    watchdog.start()
+    hops = []
+    reached = False
+    try:
+        # The header line never matches
+        for line in proc.stdout:
+            m = _HOP_RE.match(line)
+            if not m:
+                continue
+            host = m.group(2).decode() if m.group(2) != b'*' else 'timeout'
+            hops.append({
+                'hop': int(m.group(1)),
+                'host': host,
+                'latency_ms': round(float(m.group(3)), 2) if m.group(3) else None
+            })
+            if host == target or len(hops) >= max_hops:
+                reached = True
+                break
+        else:
+            proc.wait()
+    finally:
+        watchdog.cancel()
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
+    
+    if not reached and proc.returncode < 0:
+        # Killed by the watchdog
+        raise subprocess.TimeoutExpired(proc.args, 30)
+    
+    return hops
+
+
+def run_traceroute(target: str = "8.8.8.8", max_hops: int = 15) -> Dict:
     """Run traceroute to identify where network delays occur."""
     try:
-        result = subprocess.run(
-            ['traceroute', '-m', str(max_hops), '-w', '2', '-q', '1', target],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        from icmplib import traceroute as icmp_traceroute, SocketPermissionError
         
-        hops = []
-        lines = result.stdout.strip().split('\n')[1:]  # Skip header
-        
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) >= 3:
-                hop_num = parts[0]
-                if hop_num.isdigit():
-                    hop_data = {
-                        'hop': int(hop_num),
-                        'host': parts[1] if parts[1] != '*' else 'timeout',
-                        'latency_ms': None
-                    }
-                    
-                    # Look for numeric value before 'ms'
-                    for i, part in enumerate(parts[2:], start=2):
-                        try:
-                            # Try to parse current part as float
-                            latency = float(part)
-                            # Check if next part is 'ms'
-                            if i + 1 < len(parts) and parts[i + 1] == 'ms':
-                                hop_data['latency_ms'] = round(latency, 2)
-                                break
-                        except ValueError:
-                            # Also handle format like "1.610ms" (no space)
-                            if 'ms' in part and part != 'ms':
-                                try:
-                                    latency = float(part.replace('ms', ''))
-                                    hop_data['latency_ms'] = round(latency, 2)
-                                    break
-                                except ValueError:
-                                    continue
-                    
-                    hops.append(hop_data)
+        try:
+            # Native ICMP traceroute - no fork/exec, no text parsing
+            hops = [{
+                'hop': hop.distance,
+                'host': hop.address,
+                'latency_ms': round(hop.avg_rtt, 2)
+            } for hop in icmp_traceroute(target, count=1, fast=True, max_hops=max_hops, timeout=2)]
+        except SocketPermissionError:
+            # icmplib needs raw sockets for traceroute, so fall back to the
+            # system binary when not running as root / with CAP_NET_RAW
+            hops = _traceroute_subprocess(target, max_hops)
         
-        return json.dumps({
+        return {
             'success': True,
             'target': target,
             'hops': hops,
             'total_hops': len(hops)
-        })
+        }
         
     except subprocess.TimeoutExpired:
-        return json.dumps({
+        return {
             'success': False,
             'error': 'Traceroute timed out',
             'target': target
-        })
+        }
     except Exception as e:
-        return json.dumps({
+        return {
             'success': False,
             'error': str(e),
             'target': target
-        })
+        }
 
 
-def ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1") -> str:
-    """Ping multiple targets to isolate where the problem is."""
-    try:
-        target_list = targets.split(',')
-        results = []
-        
-        for target in target_list:
-            target = target.strip()
-            
-            # Special handling for 'router' - get gateway IP
-            if target.lower() == 'router':
-                gateways = netifaces.gateways()
-                default_gateway = gateways.get('default', {}).get(netifaces.AF_INET)
-                if default_gateway:
-                    target = default_gateway[0]
-                else:
-                    results.append({
-                        'target': 'router',
-                        'success': False,
-                        'latency_ms': 0,
-                        'packet_loss': 100.0,
-                        'error': 'No default gateway found'
-                    })
-                    continue
-            
-            # Ping the target
-            try:
-                result = icmp_ping(target, count=5, timeout=2, privileged=False)
-                results.append({
-                    'target': target,
-                    'success': result.is_alive,
-                    'latency_ms': round(result.avg_rtt, 2) if result.avg_rtt else 0,
-                    'packet_loss': round(result.packet_loss, 1),
-                    'min_rtt': round(result.min_rtt, 2) if result.min_rtt else 0,
-                    'max_rtt': round(result.max_rtt, 2) if result.max_rtt else 0
-                })
-            except Exception as e:
+def _ping_plan(targets: str, gateway: str = None):
+    """Split a targets string into addresses to ping and result placeholders.
+    
+    'router' is replaced by `gateway`, or looked up when not given. Targets
+    that cannot be pinged get their final result here; the rest are None.
+    """
+    target_list = [target.strip() for target in targets.split(',')]
+    
+    # Special handling for 'router' - resolve the gateway IP once up front
+    gateway_ip = gateway
+    if gateway_ip is None and any(target.lower() == 'router' for target in target_list):
+        default_gateway = _lookup_default_gateway()
+        if default_gateway:
+            gateway_ip = default_gateway[0]
+    
+    addresses = []
+    results = []
+    for target in target_list:
+        if target.lower() == 'router':
+            if not gateway_ip:
                 results.append({
-                    'target': target,
+                    'target': 'router',
                     'success': False,
                     'latency_ms': 0,
                     'packet_loss': 100.0,
-                    'error': str(e)
+                    'error': 'No default gateway found'
                 })
+                continue
+            target = gateway_ip
+        addresses.append(target)
+        results.append(None)  # Filled in from the multiping results
+    
+    return addresses, results
+
+
+def _ping_report(addresses: list, results: list, hosts) -> Dict:
+    """Fill the placeholders from _ping_plan with multiping Host results."""
+    pinged = zip(addresses, hosts)
+    for i, result in enumerate(results):
+        if result is None:
+            target, host = next(pinged)
+            results[i] = {
+                'target': target,
+                'success': host.is_alive,
+                'latency_ms': round(host.avg_rtt, 2) if host.avg_rtt else 0,
+                'packet_loss': round(host.packet_loss, 1),
+                'min_rtt': round(host.min_rtt, 2) if host.min_rtt else 0,
+                'max_rtt': round(host.max_rtt, 2) if host.max_rtt else 0
+            }
+    
+    return {
+        'success': True,
+        'results': results
+    }
+
+
+def ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1", gateway: str = None,
+                          count: int = 5) -> Dict:
+    """Ping multiple targets to isolate where the problem is.
+    
+    'router' is replaced by `gateway`, or looked up when not given.
+    `count` is the number of echo requests sent to each target.
+    """
+    try:
+        from icmplib import multiping
         
-        return json.dumps({
-            'success': True,
-            'results': results
-        })
+        addresses, results = _ping_plan(targets, gateway)
+        
+        # Ping every target in parallel instead of one after another;
+        # multiping returns a Host per address even when it timed out
+        hosts = multiping(
+            addresses,
+            count=count,
+            timeout=2,
+            privileged=False,
+            concurrent_tasks=len(addresses)
+        ) if addresses else []
+        
+        return _ping_report(addresses, results, hosts)
         
     except Exception as e:
-        return json.dumps({
+        return {
             'success': False,
             'error': str(e)
-        })
+        }
 
 
-def scan_wifi_channels(interface: str = "wlan0") -> str:
-    """Scan WiFi channels to detect congestion and interference."""
+async def async_ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1", gateway: str = None,
+                                      count: int = 5) -> Dict:
+    """Coroutine version of ping_multiple_targets for use on an event loop."""
     try:
-        result = subprocess.run(
-            ['sudo', 'iwlist', interface, 'scan'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        from icmplib import async_multiping
+        
+        addresses, results = _ping_plan(targets, gateway)
         
+        hosts = await async_multiping(
+            addresses,
+            count=count,
+            timeout=2,
+            privileged=False,
+            concurrent_tasks=len(addresses)
+        ) if addresses else []
+        
+        return _ping_report(addresses, results, hosts)
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def _freq_to_channel(freq_mhz):
+    """Approximate WiFi channel number from a centre frequency in MHz."""
+    if not freq_mhz:
+        return None
+    if 2400 < freq_mhz < 2500:
+        return (freq_mhz - 2407) // 5
+    if 5000 < freq_mhz < 5900:
+        return (freq_mhz - 5000) // 5
+    return None
+
+
+def _current_freq_netlink(interface: str):
+    """Current operating frequency (MHz) of a wireless interface via nl80211."""
+    with IPRoute() as ipr:
+        index = ipr.link_lookup(ifname=interface)
+    if not index:
+        return None
+    
+    iw = IW()
+    try:
+        for msg in iw.get_interface_by_ifindex(index[0]):
+            freq = msg.get_attr('NL80211_ATTR_WIPHY_FREQ')
+            if freq:
+                return freq
+    finally:
+        iw.close()
+    return None
+
+
+def _current_freq_iwconfig(interface: str):
+    """Current operating frequency (MHz) of a wireless interface via iwconfig."""
+    try:
+        iwconfig = subprocess.run(['iwconfig', interface], capture_output=True, **_SUBPROC_KW)
+    except OSError:
+        return None
+    match = _IWCONFIG_FREQ_RE.search(iwconfig.stdout)
+    return round(float(match.group(1)) * 1000) if match else None
+
+
+def scan_wifi_channels(interface: str = "wlan0") -> Dict:
+    """Scan WiFi channels to detect congestion and interference."""
+    try:
         networks = []
-        channel_counts = {}
+        channel_counts = Counter()
         current_network = {}
         
-        for line in result.stdout.split('\n'):
-            line = line.strip()
-            
-            if 'Cell' in line and 'Address' in line:
-                if current_network:
-                    networks.append(current_network)
-                current_network = {}
-            
-            if 'ESSID:' in line:
-                ssid = line.split('ESSID:')[1].strip('"')
-                if ssid:
-                    current_network['ssid'] = ssid
-            
-            if 'Channel:' in line:
-                try:
-                    channel = int(line.split('Channel:')[1].strip())
-                    current_network['channel'] = channel
-                    channel_counts[channel] = channel_counts.get(channel, 0) + 1
-                except:
-                    pass
-            
-            if 'Signal level=' in line:
-                try:
-                    signal_str = line.split('Signal level=')[1].split()[0]
-                    signal_dbm = int(signal_str.replace('dBm', ''))
-                    current_network['signal_dbm'] = signal_dbm
-                except:
-                    pass
+        # Stream the scan so parsing overlaps with iwlist still running; the
+        # timer enforces the same 10s budget as the old blocking run()
+        proc = subprocess.Popen(
+            ['sudo', 'iwlist', interface, 'scan'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            **_SUBPROC_KW
+        )
+        watchdog = threading.Timer(10, proc.kill)
+        watchdog.start()
+        try:
+            # Each match is a cell header or one of the fields we keep,
+            # tagged by its named group
+            for line in proc.stdout:
+                for match in _IWLIST_RE.finditer(line):
+                    field = match.lastgroup
+                    
+                    if field == 'cell':
+                        if current_network:
+                            networks.append(current_network)
+                        current_network = {}
+                    
+                    elif field == 'ssid':
+                        if match['ssid']:
+                            current_network['ssid'] = match['ssid'].decode('utf-8', 'replace')
+                    
+                    elif field == 'channel':
+                        channel = int(match['channel'])
+                        current_network['channel'] = channel
+                        channel_counts[channel] += 1
+                    
+                    else:
+                        current_network['signal_dbm'] = int(match['signal'])
+            proc.wait()
+        finally:
+            watchdog.cancel()
+            proc.kill()
+            proc.stdout.close()
+        
+        if proc.returncode < 0:
+            # Killed by the watchdog
+            raise subprocess.TimeoutExpired(proc.args, 10)
         
         if current_network:
             networks.append(current_network)
         
         # Get current channel
-        current_channel = None
-        try:
-            iwconfig = subprocess.run(['iwconfig', interface], capture_output=True, text=True)
-            for line in iwconfig.stdout.split('\n'):
-                if 'Frequency:' in line:
-                    parts = line.split()
-                    for i, part in enumerate(parts):
-                        if 'Frequency:' in part and i + 1 < len(parts):
-                            # Extract channel number from frequency
-                            freq_str = parts[i].split(':')[1]
-                            freq = float(freq_str)
-                            # Approximate channel from frequency
-                            if 2.4 < freq < 2.5:
-                                current_channel = int((freq - 2.407) / 0.005)
-                            elif 5.0 < freq < 5.9:
-                                current_channel = int((freq - 5.0) / 0.005)
-        except:
-            pass
-        
-        # Sort channels by congestion
-        sorted_channels = sorted(channel_counts.items(), key=lambda x: x[1], reverse=True)
-        most_congested = [ch for ch, count in sorted_channels[:2]]
-        
-        return json.dumps({
+        if IW is not None:
+            try:
+                current_channel = _freq_to_channel(_current_freq_netlink(interface))
+            except Exception:
+                current_channel = None
+        else:
+            current_channel = _freq_to_channel(_current_freq_iwconfig(interface))
+        
+        # Two busiest channels
+        most_congested = [ch for ch, count in channel_counts.most_common(2)]
+        
+        return {
             'success': True,
             'interface': interface,
             'networks_found': len(networks),
             'networks': networks[:20],  # First 20 networks
-            'channel_congestion': channel_counts,
+            'channel_congestion': dict(channel_counts),
             'current_channel': current_channel,
             'most_congested': most_congested
-        })
+        }
         
     except Exception as e:
-        return json.dumps({
+        return {
             'success': False,
             'error': str(e),
             'interface': interface
-        })
+        }
+
+
+async def _probe_dns_servers(servers: list) -> list:
+    """Time the same A lookup against every server at once."""
+    import dns.asyncresolver
+    
+    async def probe(server):
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = [server]
+        resolver.timeout = 2
+        resolver.lifetime = 2
+        
+        start = time.monotonic()
+        try:
+            answers = await resolver.resolve('google.com', 'A')
+        except Exception as e:
+            return {'server': server, 'success': False, 'error': str(e)}
+        return {
+            'server': server,
+            'success': True,
+            'latency_ms': round((time.monotonic() - start) * 1000, 2),
+            'resolved_ip': str(answers[0]),
+            'ttl': answers.rrset.ttl
+        }
+    
+    return await asyncio.gather(*(probe(server) for server in servers))
 
 
-def check_dns_servers() -> str:
-    """Check DNS server performance."""
+def check_dns_servers(dns_server: str = None, resolver=None) -> Dict:
+    """
+    Check DNS server performance (defaults to the gateway's resolver)
+    Pass a pre-configured `resolver` to skip building a new one per call,
+    or several comma-separated servers to query them all concurrently
+    """
     try:
         import dns.resolver
         
         # Get default gateway as DNS server
-        gateways = netifaces.gateways()
-        default_gateway = gateways.get('default', {}).get(netifaces.AF_INET)
-        dns_server = default_gateway[0] if default_gateway else '192.168.50.1'
+        if dns_server is None:
+            default_gateway = _lookup_default_gateway()
+            dns_server = default_gateway[0] if default_gateway else '192.168.50.1'
         
-        resolver = dns.resolver.Resolver()
-        resolver.nameservers = [dns_server]
-        resolver.timeout = 2
-        resolver.lifetime = 2
+        if ',' in dns_server:
+            # Total time is the slowest server, not the sum of all of them
+            servers = [server.strip() for server in dns_server.split(',')]
+            entries = asyncio.run(_probe_dns_servers(servers))
+            return {
+                'success': any(entry['success'] for entry in entries),
+                'dns_servers': entries,
+                'test_domain': 'google.com'
+            }
+        
+        if resolver is None:
+            resolver = dns.resolver.Resolver()
+            resolver.nameservers = [dns_server]
+            resolver.timeout = 2
+            resolver.lifetime = 2
         
         start = time.time()
         answers = resolver.resolve('google.com', 'A')
         latency_ms = (time.time() - start) * 1000
         
-        return json.dumps({
+        return {
             'success': True,
             'dns_servers': [{
                 'server': dns_server,
                 'success': True,
                 'latency_ms': round(latency_ms, 2),
-                'resolved_ip': str(answers[0])
+                'resolved_ip': str(answers[0]),
+                'ttl': answers.rrset.ttl
             }],
             'test_domain': 'google.com'
-        })
+        }
         
     except Exception as e:
-        return json.dumps({
+        return {
             'success': False,
             'error': str(e)
-        })
+        }
+
+
+def _arp_entries_netlink() -> list:
+    """Read the kernel neighbour table over Netlink (no `arp` subprocess)."""
+    with IPRoute() as ipr:
+        ifnames = {link['index']: link.get_attr('IFLA_IFNAME') for link in ipr.get_links()}
+        return [{
+            'ip': neigh.get_attr('NDA_DST'),
+            'mac': neigh.get_attr('NDA_LLADDR'),
+            'interface': ifnames.get(neigh['ifindex'])
+        } for neigh in ipr.get_neighbours(family=socket.AF_INET)]
+
+
+def _arp_entries_proc() -> list:
+    """Parse /proc/net/arp directly - one read, one regex pass, no subprocess."""
+    with open('/proc/net/arp', 'rb') as f:
+        data = f.read()
+    
+    return [{
+        'ip': ip.decode(),
+        'mac': mac.decode() if mac != b'00:00:00:00:00:00' else None,  # incomplete entry
+        'interface': iface.decode()
+    } for ip, mac, iface in _ARP_RE.findall(data)]
 
 
-def check_arp_table() -> str:
+def _arp_entries_subprocess() -> list:
+    """Fallback for systems without /proc/net/arp: parse `arp -n` output."""
+    result = subprocess.run(
+        ['arp', '-n'],
+        capture_output=True,
+        timeout=5,
+        **_SUBPROC_KW
+    )
+    
+    entries = []
+    lines = result.stdout.splitlines()[1:]  # Skip header
+    
+    for line in lines:
+        # Address HWtype HWaddress Flags Iface - never need more than 5 fields
+        parts = line.split(None, 4)
+        if len(parts) >= 3:
+            incomplete = parts[1] == b'(incomplete)'
+            entries.append({
+                'ip': parts[0].decode(),
+                'mac': None if incomplete else parts[2].decode(),
+                'interface': parts[-1].decode() if incomplete or len(parts) > 4 else None
+            })
+    
+    return entries
+
+
+# Seconds the agents reuse an ARP table read - the table changes rarely next
+# to how often diagnoses run back to back. (procfs reports the current time
+# as /proc/net/arp's mtime, so an mtime check can't stand in for this.)
+ARP_CACHE_TTL = 60
+
+
+def check_arp_table() -> Dict:
     """Check ARP table to see devices on local network."""
     try:
-        result = subprocess.run(
-            ['arp', '-n'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        entries = []
-        lines = result.stdout.strip().split('\n')[1:]  # Skip header
-        
-        for line in lines:
-            parts = line.split()
-            if len(parts) >= 3:
-                entries.append({
-                    'ip': parts[0],
-                    'mac': parts[2] if parts[2] != '(incomplete)' else None,
-                    'interface': parts[-1] if len(parts) > 4 else None
-                })
+        if IPRoute is not None:
+            entries = _arp_entries_netlink()
+        elif os.path.exists('/proc/net/arp'):
+            entries = _arp_entries_proc()
+        else:
+            entries = _arp_entries_subprocess()
         
-        return json.dumps({
+        return {
             'success': True,
             'entries': entries,
             'total_devices': len(entries)
-        })
+        }
         
     except Exception as e:
-        return json.dumps({
+        return {
             'success': False,
             'error': str(e)
-        })
+        }
 
 
-def check_network_congestion() -> str:
+def check_network_congestion() -> Dict:
     """Check for network congestion indicators."""
     # This is a placeholder - not actually used but included for compatibility
-    return json.dumps({'success': True, 'congestion': 'normal'})
+    return {'success': True, 'congestion': 'normal'}
 
 
 # ============================================================================
 # WORKING DIAGNOSTIC AGENT CLASS
 # ============================================================================
 
+def _safe(fn, *args) -> Dict:
+    """Call a diagnostic tool, turning any failure into a {'success': False} result."""
+    try:
+        result = fn(*args)
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+    if not isinstance(result, dict):
+        return {'success': False, 'error': f'Unexpected result from {fn.__name__}'}
+    return result
+
+
+# Target address prefixes treated as the local router (RFC 1918 ranges)
+_PRIVATE_PREFIXES = ('192.168.', '10.') + tuple(f'172.{n}.' for n in range(16, 32))
+
+# Latency diagnoses keyed by (router bucket, internet bucket); '*' matches
+# any internet latency. Text fields are str.format templates over
+# {router}, {internet} and {signal}
+_LATENCY_RULES = {
+    # High router latency = local network issue
+    ('high', '*'): {
+        'issue': 'high_local_network_latency',
+        'root_cause': 'Router latency is high ({router}ms), indicating local network congestion or WiFi issues',
+        'confidence': 'high',
+        'evidence': ['Router latency: {router}ms (threshold: 50ms)'],
+        'recommendations': [
+            'Check router CPU/memory usage',
+            'Restart router',
+            'Reduce number of connected devices'
+        ],
+        'weak_signal': (['WiFi signal is weak: {signal}dBm'], [
+            'Move closer to WiFi router',
+            'Switch to 5GHz band if available',
+            'Check for WiFi interference'
+        ]),
+    },
+    # Router fast but internet slow = ISP/routing issue
+    ('fast', 'slow'): {
+        'issue': 'high_external_latency',
+        'root_cause': 'Router is responsive ({router}ms) but external hosts are slow ({internet:.0f}ms avg), indicating ISP or internet routing issues',
+        'confidence': 'high',
+        'evidence': ['Router: {router}ms (fast)', 'Internet: {internet:.0f}ms (slow)'],
+        'recommendations': [
+            'Contact ISP about latency issues',
+            'Check if other users on network experiencing same issue',
+            'Try wired connection to rule out WiFi'
+        ],
+    },
+    # Everything moderately slow = WiFi quality
+    ('moderate', '*'): {
+        'issue': 'moderate_network_degradation',
+        'root_cause': 'Moderate latency across local and external hosts, likely WiFi signal quality or interference',
+        'confidence': 'medium',
+        'evidence': ['Router: {router}ms (moderate)', 'Signal: {signal}dBm'],
+        'recommendations': [
+            'Improve WiFi signal strength',
+            'Switch to 5GHz band',
+            'Move closer to router'
+        ],
+        'check_congestion': True,
+    },
+}
+
+
+def _match_latency_rule(router_latency, internet_latency):
+    """Bucket the measured latencies and look up the matching _LATENCY_RULES entry."""
+    if not router_latency:
+        return None
+    if router_latency > 100:
+        router_bucket = 'high'
+    elif router_latency < 50:
+        router_bucket = 'fast'
+    elif router_latency > 50:
+        router_bucket = 'moderate'
+    else:
+        return None
+    internet_bucket = 'slow' if internet_latency > 200 else 'ok'
+    return _LATENCY_RULES.get((router_bucket, internet_bucket)) or _LATENCY_RULES.get((router_bucket, '*'))
+
+
+# WiFi signal quality: signals at or above each bound (dBm) get the next label
+_SIGNAL_QUALITY_BOUNDS = (-70, -60, -50)
+_SIGNAL_QUALITY_LABELS = ('weak', 'fair', 'good', 'excellent')
+
+
+def _signal_quality(signal_dbm) -> str:
+    """Quality label for a WiFi signal level in dBm."""
+    return _SIGNAL_QUALITY_LABELS[bisect_right(_SIGNAL_QUALITY_BOUNDS, signal_dbm)]
+
+
+# Tool name and one-line progress summary printed after each tool completes
+_TOOL_REPORTS = {
+    'ping_multiple': ('ping_multiple_targets', lambda r: f"tested {len(r['results'])} targets"),
+    'traceroute': ('run_traceroute', lambda r: f"traced {r['total_hops']} hops"),
+    'wifi_scan': ('scan_wifi_channels', lambda r: f"found {r['networks_found']} networks"),
+    'dns_check': ('check_dns_servers', lambda r: f"tested {len(r['dns_servers'])} DNS servers"),
+    'arp_table': ('check_arp_table', lambda r: f"found {r['total_devices']} devices"),
+}
+
+
 class WorkingDiagnosticAgent:
     """
     Diagnostic agent that ACTUALLY runs tools and analyzes results
     No LLM flakiness - pure Python logic
     """
     
-    def __init__(self, interface: str = "wlan0"):
+    # Seconds a default-gateway lookup stays valid
+    GATEWAY_CACHE_TTL = 60
+    
+    def __init__(self, interface: str = "wlan0", dns_max_ttl: float = float('inf'),
+                 dns_error_ttl: float = 0.15):
+        """
+        Args:
+            interface: Network interface to diagnose
+            dns_max_ttl: Upper bound (seconds) on how long a DNS answer is reused;
+                0 disables the DNS cache
+            dns_error_ttl: Seconds a failed DNS check is reused before retrying
+        """
         self.interface = interface
+        self.dns_max_ttl = dns_max_ttl
+        self.dns_error_ttl = dns_error_ttl
+        self._gw_cache = (0.0, None, 0)  # (fetched_at, (gateway_ip, interface), down events then)
+        self._resolver = None
+        self._dns_cache = {}  # dns_server -> (expires_at, result)
+        self._arp_cache = (0.0, None)  # (expires_at, result)
         print(f"✅ Working Diagnostic Agent initialized - interface: {interface}")
     
+    def _default_gateway_ip(self):
+        """
+        Default gateway IP, cached for GATEWAY_CACHE_TTL seconds
+        The cache is dropped early once the link watcher sees the gateway's
+        interface go down
+        """
+        fetched_at, gateway, downs = self._gw_cache
+        if (gateway and time.monotonic() - fetched_at < self.GATEWAY_CACHE_TTL
+                and _link_down_count(gateway[1]) == downs):
+            return gateway[0]
+        
+        try:
+            gateway = _lookup_default_gateway()
+        except ImportError:
+            gateway = None  # the tools that need it report the missing package
+        # Any down event for this interface after now invalidates the entry
+        downs = _link_down_count(gateway[1]) if gateway else 0
+        self._gw_cache = (time.monotonic(), gateway, downs)
+        return gateway[0] if gateway else None
+    
+    def _dns_resolver(self, dns_server: str):
+        """Shared resolver; nameservers are only rewritten when the server changes"""
+        if self._resolver is None:
+            import dns.resolver
+            # configure=False: we set the nameserver ourselves, skip /etc/resolv.conf
+            self._resolver = dns.resolver.Resolver(configure=False)
+            self._resolver.timeout = 2
+            self._resolver.lifetime = 2
+        if self._resolver.nameservers != [dns_server]:
+            self._resolver.nameservers = [dns_server]
+        return self._resolver
+    
+    def _check_dns(self, dns_server: str = None) -> Dict:
+        """
+        check_dns_servers with results reused for the answer's DNS TTL
+        (capped at dns_max_ttl); failures are reused for dns_error_ttl
+        """
+        dns_server = dns_server or '192.168.50.1'
+        now = time.monotonic()
+        
+        cached = self._dns_cache.get(dns_server)
+        if cached and cached[0] > now:
+            return {**cached[1], 'cached': True}
+        
+        try:
+            resolver = self._dns_resolver(dns_server)
+        except ImportError:
+            resolver = None
+        result = check_dns_servers(dns_server, resolver)
+        
+        if result.get('success'):
+            ttl = min([e['ttl'] for e in result['dns_servers'] if e['success']] + [self.dns_max_ttl])
+        else:
+            ttl = self.dns_error_ttl
+        if ttl > 0:
+            self._dns_cache[dns_server] = (now + ttl, result)
+        
+        return result
+    
+    def _check_arp(self) -> Dict:
+        """check_arp_table with successful reads reused for ARP_CACHE_TTL seconds"""
+        now = time.monotonic()
+        expires_at, cached = self._arp_cache
+        if cached and expires_at > now:
+            return {**cached, 'cached': True}
+        
+        result = check_arp_table()
+        if result.get('success'):
+            self._arp_cache = (now + ARP_CACHE_TTL, result)
+        return result
+    
     def diagnose(self, alert: Dict) -> Dict:
         """
         Run diagnostics on network issue
@@ -337,6 +830,10 @@ class WorkingDiagnosticAgent:
         Returns:
             Comprehensive diagnosis with root cause
         """
+        return asyncio.run(self.diagnose_async(alert))
+    
+    async def diagnose_async(self, alert: Dict) -> Dict:
+        """Coroutine version of diagnose() for callers already on an event loop."""
         print(f"\n🔬 Starting REAL diagnostic investigation...")
         print(f"📊 Alert status: {alert['status']}\n")
         
@@ -345,69 +842,29 @@ class WorkingDiagnosticAgent:
         print("STEP 1: Running diagnostic tools...")
         print("="*70)
         
-        results = {}
-        
-        # Tool 1: Ping multiple targets
-        print("\n🔧 Tool 1: ping_multiple_targets")
-        try:
-            ping_result = ping_multiple_targets("router,8.8.8.8,1.1.1.1")
-            results['ping_multiple'] = json.loads(ping_result)
-            print(f"   ✅ Completed - tested {len(results['ping_multiple']['results'])} targets")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['ping_multiple'] = {'success': False, 'error': str(e)}
-        
-        # Tool 2: Traceroute
-        print("\n🔧 Tool 2: run_traceroute")
-        try:
-            trace_result = run_traceroute("8.8.8.8")
-            results['traceroute'] = json.loads(trace_result)
-            if results['traceroute'].get('success'):
-                print(f"   ✅ Completed - traced {results['traceroute']['total_hops']} hops")
-            else:
-                print(f"   ⚠️  {results['traceroute'].get('error')}")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['traceroute'] = {'success': False, 'error': str(e)}
+        gateway = self._default_gateway_ip()
         
-        # Tool 3: WiFi scan
-        print("\n🔧 Tool 3: scan_wifi_channels")
-        try:
-            wifi_result = scan_wifi_channels(self.interface)
-            results['wifi_scan'] = json.loads(wifi_result)
-            if results['wifi_scan'].get('success'):
-                print(f"   ✅ Completed - found {results['wifi_scan']['networks_found']} networks")
-            else:
-                print(f"   ⚠️  {results['wifi_scan'].get('error')}")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['wifi_scan'] = {'success': False, 'error': str(e)}
+        # The tools are independent and spend nearly all their time blocked on
+        # subprocesses and sockets, so overlap them on one event loop. Pings
+        # are native async; the rest run in worker threads
+        tools = {
+            'ping_multiple': async_ping_multiple_targets("router,8.8.8.8,1.1.1.1", gateway),
+            'traceroute': run_in_pool(_safe, run_traceroute, "8.8.8.8"),
+            'wifi_scan': run_in_pool(_safe, scan_wifi_channels, self.interface),
+            'dns_check': run_in_pool(_safe, self._check_dns, gateway),
+            'arp_table': run_in_pool(_safe, self._check_arp),
+        }
         
-        # Tool 4: DNS check
-        print("\n🔧 Tool 4: check_dns_servers")
-        try:
-            dns_result = check_dns_servers()
-            results['dns_check'] = json.loads(dns_result)
-            if results['dns_check'].get('success'):
-                print(f"   ✅ Completed - tested {len(results['dns_check']['dns_servers'])} DNS servers")
-            else:
-                print(f"   ⚠️  Failed")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['dns_check'] = {'success': False, 'error': str(e)}
+        results = dict(zip(tools, await asyncio.gather(*tools.values())))
         
-        # Tool 5: ARP table
-        print("\n🔧 Tool 5: check_arp_table")
-        try:
-            arp_result = check_arp_table()
-            results['arp_table'] = json.loads(arp_result)
-            if results['arp_table'].get('success'):
-                print(f"   ✅ Completed - found {results['arp_table']['total_devices']} devices")
+        # Report in the usual tool order once everything has finished
+        for i, (name, result) in enumerate(results.items(), 1):
+            tool_name, summarize = _TOOL_REPORTS[name]
+            print(f"\n🔧 Tool {i}: {tool_name}")
+            if result.get('success'):
+                print(f"   ✅ Completed - {summarize(result)}")
             else:
-                print(f"   ⚠️  Failed")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['arp_table'] = {'success': False, 'error': str(e)}
+                print(f"   ⚠️  {result.get('error', 'Failed')}")
         
         # Step 2: Analyze with PYTHON RULES (not LLM)
         print("\n" + "="*70)
@@ -442,81 +899,57 @@ class WorkingDiagnosticAgent:
         signal_dbm = metrics.get('signal', {}).get('signal_dbm', 0)
         dns_latency = metrics.get('dns', {}).get('latency_ms', 0)
         
+        # Split ping results into router vs internet latency once
+        pm = results.get('ping_multiple') or {}
+        pm_ok = pm.get('success')
+        ping_results = pm.get('results', ())
+        
+        router_latency = None
+        inet_sum = 0.0
+        inet_n = 0
+        
+        for result in ping_results:
+            tgt = result['target']
+            lat = result.get('latency_ms', 0)
+            if tgt == 'router' or tgt.startswith(_PRIVATE_PREFIXES):
+                router_latency = lat
+            else:
+                inet_sum += lat
+                inet_n += 1
+        
+        avg_internet_latency = inet_sum / inet_n if inet_n else 0
+        
         # Rule 1: Check ping multiple targets results
-        if results.get('ping_multiple', {}).get('success'):
-            ping_results = results['ping_multiple']['results']
-            
-            router_latency = None
-            internet_latency = []
-            
-            for result in ping_results:
-                if 'router' in result.get('target', '').lower() or result['target'].startswith('192.168'):
-                    router_latency = result.get('latency_ms')
-                else:
-                    internet_latency.append(result.get('latency_ms', 0))
-            
-            avg_internet_latency = sum(internet_latency) / len(internet_latency) if internet_latency else 0
-            
+        if pm_ok:
             print(f"\n📊 Latency Analysis:")
             print(f"   Router: {router_latency}ms" if router_latency else "   Router: not tested")
             print(f"   Internet: {avg_internet_latency:.1f}ms avg")
             print(f"   Monitor reported: {ping_latency}ms")
             
-            # RULE: High router latency = local network issue
-            if router_latency and router_latency > 100:
-                diagnosis['primary_issue'] = 'high_local_network_latency'
-                diagnosis['root_cause'] = f'Router latency is high ({router_latency}ms), indicating local network congestion or WiFi issues'
-                diagnosis['confidence'] = 'high'
-                diagnosis['evidence'].append(f'Router latency: {router_latency}ms (threshold: 50ms)')
+            rule = _match_latency_rule(router_latency, avg_internet_latency)
+            if rule:
+                fields = {'router': router_latency, 'internet': avg_internet_latency, 'signal': signal_dbm}
+                evidence = rule['evidence']
+                recommendations = rule['recommendations']
                 
-                # Check WiFi as secondary cause
-                if signal_dbm and signal_dbm < -70:
-                    diagnosis['evidence'].append(f'WiFi signal is weak: {signal_dbm}dBm')
-                    diagnosis['recommendations'].extend([
-                        'Move closer to WiFi router',
-                        'Switch to 5GHz band if available',
-                        'Check for WiFi interference'
-                    ])
-                else:
-                    diagnosis['recommendations'].extend([
-                        'Check router CPU/memory usage',
-                        'Restart router',
-                        'Reduce number of connected devices'
-                    ])
-            
-            # RULE: Router fast but internet slow = ISP/routing issue
-            elif router_latency and router_latency < 50 and avg_internet_latency > 200:
-                diagnosis['primary_issue'] = 'high_external_latency'
-                diagnosis['root_cause'] = f'Router is responsive ({router_latency}ms) but external hosts are slow ({avg_internet_latency:.0f}ms avg), indicating ISP or internet routing issues'
-                diagnosis['confidence'] = 'high'
-                diagnosis['evidence'].append(f'Router: {router_latency}ms (fast)')
-                diagnosis['evidence'].append(f'Internet: {avg_internet_latency:.0f}ms (slow)')
-                diagnosis['recommendations'].extend([
-                    'Contact ISP about latency issues',
-                    'Check if other users on network experiencing same issue',
-                    'Try wired connection to rule out WiFi'
-                ])
-            
-            # RULE: Everything moderately slow = WiFi quality
-            elif router_latency and 50 < router_latency < 150:
-                diagnosis['primary_issue'] = 'moderate_network_degradation'
-                diagnosis['root_cause'] = 'Moderate latency across local and external hosts, likely WiFi signal quality or interference'
-                diagnosis['confidence'] = 'medium'
-                diagnosis['evidence'].append(f'Router: {router_latency}ms (moderate)')
-                diagnosis['evidence'].append(f'Signal: {signal_dbm}dBm')
+                # Weak WiFi as the secondary cause changes the advice
+                if 'weak_signal' in rule and signal_dbm and signal_dbm < -70:
+                    evidence, recommendations = rule['weak_signal']
+                    evidence = rule['evidence'] + evidence
+                
+                diagnosis['primary_issue'] = rule['issue']
+                diagnosis['root_cause'] = rule['root_cause'].format(**fields)
+                diagnosis['confidence'] = rule['confidence']
+                diagnosis['evidence'].extend(e.format(**fields) for e in evidence)
                 
                 # Check WiFi congestion
-                if results.get('wifi_scan', {}).get('success'):
+                if rule.get('check_congestion') and results.get('wifi_scan', {}).get('success'):
                     networks = results['wifi_scan'].get('networks_found', 0)
                     if networks > 20:
                         diagnosis['evidence'].append(f'{networks} WiFi networks detected (congested environment)')
                         diagnosis['recommendations'].append('Switch to less congested WiFi channel')
                 
-                diagnosis['recommendations'].extend([
-                    'Improve WiFi signal strength',
-                    'Switch to 5GHz band',
-                    'Move closer to router'
-                ])
+                diagnosis['recommendations'].extend(recommendations)
         
         # Rule 2: Check DNS performance
         if dns_latency > 1000:
@@ -525,14 +958,7 @@ class WorkingDiagnosticAgent:
         
         # Rule 3: Check WiFi signal if available
         if signal_dbm:
-            if signal_dbm >= -50:
-                quality = "excellent"
-            elif signal_dbm >= -60:
-                quality = "good"
-            elif signal_dbm >= -70:
-                quality = "fair"
-            else:
-                quality = "weak"
+            quality = _signal_quality(signal_dbm)
             
             diagnosis['evidence'].append(f'WiFi signal: {signal_dbm}dBm ({quality})')
             
@@ -542,18 +968,8 @@ class WorkingDiagnosticAgent:
         # Check if network is actually healthy
         if not diagnosis['root_cause']:
             # If router and internet latency are both good, network is healthy!
-            if results.get('ping_multiple', {}).get('success'):
-                ping_results = results['ping_multiple']['results']
-                router_latency = None
-                internet_latencies = []
-                
-                for result in ping_results:
-                    if 'router' in result.get('target', '').lower() or result['target'].startswith('192.168'):
-                        router_latency = result.get('latency_ms', 0)
-                    else:
-                        internet_latencies.append(result.get('latency_ms', 0))
-                
-                avg_internet = sum(internet_latencies) / len(internet_latencies) if internet_latencies else 0
+            if pm_ok:
+                avg_internet = avg_internet_latency
                 
                 # Network is healthy if router < 50ms and internet < 100ms
                 if router_latency and router_latency < 50 and avg_internet < 100:
@@ -660,8 +1076,7 @@ if __name__ == "__main__":
         
         # Save to file
         output_file = '/tmp/diagnostic_result_working.json'
-        with open(output_file, 'w') as f:
-            json.dump(diagnosis, f, indent=2)
+        save_json(diagnosis, output_file)
         print(f"\n💾 Diagnosis saved to: {output_file}")
     
     elif args.mode == 'file':
@@ -670,15 +1085,13 @@ if __name__ == "__main__":
             exit(1)
         
         print(f"\n📁 Loading alert from: {args.alert_file}\n")
-        with open(args.alert_file, 'r') as f:
-            alert = json.load(f)
+        alert = load_json(args.alert_file)
         
         diagnosis = diagnostic.diagnose(alert)
         diagnostic.print_diagnosis(diagnosis)
         
         # Save to file
         output_file = '/tmp/diagnostic_result_working.json'
-        with open(output_file, 'w') as f:
-            json.dump(diagnosis, f, indent=2)
+        save_json(diagnosis, output_file)
         print(f"\n💾 Diagnosis saved to: {output_file}")
 
@@ -3,9 +3,12 @@ Diagnostic Agent - Rule-Based (ACTUALLY WORKS!)
 Forces tool execution, uses Python logic for analysis
 """
 
-import json
 import re
 import time
+import threading
+from collections import namedtuple
+from bisect import bisect_left, bisect_right
+from concurrent.futures import as_completed
 from datetime import datetime
 from typing import Dict
 
@@ -20,18 +23,255 @@ try:
         scan_wifi_channels,
         check_dns_servers,
         check_network_congestion,
-        check_arp_table
+        check_arp_table,
+        save_json,
+        load_json,
+        _safe,
+        _lookup_default_gateway,
+        _match_latency_rule,
+        _signal_quality,
+        _PRIVATE_PREFIXES,
+        ARP_CACHE_TTL,
+        _TOOL_REPORTS
     )
 except ImportError:
     print("Error importing tools from diagnostic_agent.py")
     exit(1)
 
-# Import CrewAI for AI scoring
-try:
-    from crewai import Agent, Task, Crew
-except ImportError:
-    print("Warning: CrewAI not available, AI scoring will be disabled")
-    Agent = Task = Crew = None
+from _exec import SHARED_POOL
+
+
+def _flush(lines: list):
+    """Write buffered status lines to stdout in one call and empty the buffer"""
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+        lines.clear()
+
+
+def _call_with_timeout(timeout: float, fn, *args, **kwargs):
+    """
+    Run fn on a daemon thread and return its result, raising TimeoutError if
+    it takes longer than timeout. A timed-out call is left running but can't
+    hold up interpreter exit the way an executor worker would.
+    """
+    done = threading.Event()
+    outcome = {}
+    
+    def run():
+        try:
+            outcome['result'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+    
+    threading.Thread(target=run, name='diag-timeout', daemon=True).start()
+    if not done.wait(timeout):
+        raise TimeoutError(f"{getattr(fn, '__name__', 'call')} took longer than {timeout}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+class _DiscardLog(list):
+    """Status-line buffer that drops everything, for silent analysis runs"""
+    
+    def append(self, line):
+        pass
+    
+    def extend(self, lines):
+        pass
+    
+    def __iadd__(self, lines):
+        return self
+
+
+# CrewAI is only needed for AI scoring and is slow to import, so it is
+# loaded by _load_crewai() the first time a score is actually requested
+Agent = Task = Crew = None
+
+
+def _load_crewai(say=print) -> bool:
+    """
+    Import CrewAI into the module globals on first use; False if unavailable
+    The missing-CrewAI warning goes through `say` so a quiet agent can drop it
+    """
+    global Agent, Task, Crew
+    if Agent is None:
+        try:
+            from crewai import Agent, Task, Crew
+        except ImportError:
+            say("Warning: CrewAI not available, AI scoring will be disabled")
+            return False
+    return True
+
+
+# Health scoring task - {router}, {internet} and {signal} are filled in per
+# diagnosis by CrewAI input interpolation, so the Task/Crew are built once
+SCORING_TASK_PROMPT = """Score this network 0-100:
+- Router: {router}ms (Good: <50, Bad: >100)
+- Internet: {internet}ms (Good: <100, Bad: >200)
+- WiFi: {signal}dBm (Good: >-60, Bad: <-70)
+
+Give ONE number 0-100 and short reason.
+Format: NUMBER|reason
+Example: 85|fast router, good signal
+
+Your score:"""
+
+
+# ============================================================================
+# HEALTH SCORE BUCKETS - Rule-based scoring without an LLM round-trip
+# ============================================================================
+
+# Sorted bucket boundaries. Latency and loss penalties apply strictly above a
+# boundary (bisect_left), signal penalties strictly below one (bisect_right)
+_LATENCY_BOUNDS = (10, 50, 100, 200)
+_SIGNAL_BOUNDS = (-80, -70)
+_LOSS_BOUNDS = (5,)
+
+# Per-metric (bounds, bisect, penalty per bucket, issue per bucket)
+_SCORE_BUCKETS = (
+    (_LATENCY_BOUNDS, bisect_left, (0, 0, 15, 30, 30),
+     (None, None, "moderate router latency", "high router latency", "high router latency")),
+    (_LATENCY_BOUNDS, bisect_left, (0, 0, 0, 10, 20),
+     (None, None, None, None, "high internet latency")),
+    (_SIGNAL_BOUNDS, bisect_right, (25, 10, 0),
+     ("weak WiFi signal", None, None)),
+    (_LOSS_BOUNDS, bisect_left, (0, 20),
+     (None, "packet loss")),
+)
+
+# Health score display: scores at or above each bound get the next rating
+_SCORE_RATING_BOUNDS = (40, 70, 90)
+_SCORE_RATINGS = (("🔴", "POOR"), ("🟠", "FAIR"), ("🟡", "GOOD"), ("🟢", "EXCELLENT"))
+
+# All 11 possible score bars, from empty to full
+_HEALTH_BARS = tuple("█" * i + "░" * (10 - i) for i in range(11))
+
+
+def _bucket_score(router_latency, internet_latency, signal_dbm, packet_loss) -> tuple:
+    """
+    Score network health 0-100 by bucketing each metric
+    
+    Returns:
+        (score, issues, unambiguous) - unambiguous when every metric sits in
+        its best or worst bucket, i.e. there is nothing borderline to judge
+    """
+    score = 100
+    issues = []
+    unambiguous = True
+    
+    values = (router_latency, internet_latency, signal_dbm, packet_loss)
+    for value, (bounds, locate, penalties, labels) in zip(values, _SCORE_BUCKETS):
+        bucket = locate(bounds, value or 0)
+        score -= penalties[bucket]
+        if labels[bucket]:
+            issues.append(labels[bucket])
+        if penalties[bucket] not in (min(penalties), max(penalties)):
+            unambiguous = False
+    
+    return max(0, score), issues, unambiguous
+
+
+# ============================================================================
+# PING SUMMARY - Router vs internet split, computed once per diagnosis
+# ============================================================================
+
+PingSummary = namedtuple('PingSummary', 'router_latency internet_latencies avg_internet first_internet')
+
+_NO_PINGS = PingSummary(None, (), 0, 0)
+
+
+def _summarize_pings(ping_multiple: Dict) -> PingSummary:
+    """
+    Split ping_multiple_targets results into router and internet latencies
+    
+    first_internet is the first internet target that answered (0 if none);
+    missing latencies count as 0
+    """
+    if not (ping_multiple or {}).get('success'):
+        return _NO_PINGS
+    
+    router_latency = None
+    internet_latencies = []
+    first_internet = None
+    for result in ping_multiple['results']:
+        target = result.get('target', '')
+        latency = result.get('latency_ms') or 0
+        # ping tools report the gateway by IP, or as 'router' when none was found
+        if target == 'router' or target.startswith(_PRIVATE_PREFIXES):
+            router_latency = latency
+        else:
+            internet_latencies.append(latency)
+            if first_internet is None and result.get('success'):
+                first_internet = latency
+    
+    avg_internet = sum(internet_latencies) / len(internet_latencies) if internet_latencies else 0
+    return PingSummary(router_latency, internet_latencies, avg_internet, first_internet or 0)
+
+
+# Markdown emphasis/heading characters LLMs like to wrap answers in
+_MARKDOWN_RE = re.compile(r'[*#]')
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == '_'
+
+
+def _parse_score(response: str) -> tuple:
+    """
+    Find the first standalone 0-100 integer in a single pass over response
+    
+    Returns:
+        (score, rest) - rest is the text following the number;
+        (None, '') when there is no such number
+    """
+    n = len(response)
+    i = 0
+    while i < n:
+        if not '0' <= response[i] <= '9':
+            i += 1
+            continue
+        
+        # Consume the whole digit run, then check it stands alone
+        start = i
+        while i < n and '0' <= response[i] <= '9':
+            i += 1
+        if (i - start <= 3
+                and (start == 0 or not _is_word_char(response[start - 1]))
+                and (i == n or not _is_word_char(response[i]))):
+            value = int(response[start:i])
+            if value <= 100:
+                return value, response[i:]
+    
+    return None, ''
+
+
+class _TTLCache:
+    """Tiny key -> (expires_at, value) cache for tool results"""
+    
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get_or_compute(self, key, ttl: float, compute):
+        """Return the cached value for key, or compute and store it for ttl seconds
+        
+        Failed tool results ({'success': False}) are never cached
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            return {**entry[1], 'cached': True}
+        
+        value = compute()
+        if value.get('success'):
+            with self._lock:
+                self._entries[key] = (now + ttl, value)
+        return value
 
 
 class WorkingDiagnosticAgent:
@@ -41,13 +281,55 @@ class WorkingDiagnosticAgent:
     Uses CrewAI only for AI health scoring
     """
     
-    def __init__(self, interface: str = "wlan0", llm=None, enable_ai_scoring=True):
+    # Seconds a tool result is reused; ping, wifi scan and the DNS lookup are
+    # never cached since they measure the very thing being diagnosed
+    ARP_CACHE_TTL = ARP_CACHE_TTL  # shared with diagnostic_agent's agent
+    # Seconds the DNS server and resolver are reused - the lookup is re-timed
+    DNS_SETUP_TTL = ARP_CACHE_TTL
+    
+    # Monitor metrics below which a 'healthy' alert only gets a quick router
+    # ping to confirm, instead of the full tool run
+    HEALTHY_PING_MS = 50
+    HEALTHY_SIGNAL_DBM = -65
+    
+    def __init__(self, interface: str = "wlan0", llm=None, enable_ai_scoring=True,
+                 scoring_timeout: float = 5.0, verbose: bool = True):
+        """
+        Args:
+            interface: Network interface to diagnose
+            llm: LLM for AI health scoring (None disables it)
+            enable_ai_scoring: Use the LLM for borderline health scores
+            scoring_timeout: Seconds to wait for the LLM before using the rule-based score
+            verbose: Print progress while diagnosing (print_diagnosis always prints)
+        """
         self.interface = interface
         self.llm = llm
-        self.enable_ai_scoring = enable_ai_scoring and llm is not None and Agent is not None
+        self.scoring_timeout = scoring_timeout
+        self.verbose = verbose
+        self._cache = _TTLCache()
+        self._dns_setup = (0.0, None, None)  # (expires_at, server, resolver)
+        self.enable_ai_scoring = enable_ai_scoring and llm is not None
+        self.scoring_agent = None  # Built on first use by _get_scoring_agent()
+        self.scoring_crew = None   # Built on first use by _get_scoring_crew()
         
-        # Create AI scoring agent if available (simple and fast!)
         if self.enable_ai_scoring:
+            self._say(f"✅ Working Diagnostic Agent initialized - interface: {interface} (AI scoring enabled)")
+        else:
+            self._say(f"✅ Working Diagnostic Agent initialized - interface: {interface}")
+    
+    def _say(self, line: str):
+        """Print a progress line unless the agent is quiet"""
+        if self.verbose:
+            print(line)
+    
+    def _new_log(self) -> list:
+        """Status-line buffer for one run - discards everything when quiet"""
+        return [] if self.verbose else _DiscardLog()
+    
+    def _get_scoring_agent(self):
+        """AI scoring agent, created on first call (None if CrewAI is missing)"""
+        if self.scoring_agent is None and _load_crewai(self._say):
+            # Simple and fast!
             self.scoring_agent = Agent(
                 role='Network Health Scorer',
                 goal='Rate network health from 0-100 based on latency and signal',
@@ -58,13 +340,25 @@ class WorkingDiagnosticAgent:
 Answer with just a number and brief reason.""",
                 tools=[],
                 verbose=False,
-                llm=llm,
+                llm=self.llm,
                 max_iter=1  # Only one iteration for speed
             )
-            print(f"✅ Working Diagnostic Agent initialized - interface: {interface} (AI scoring enabled)")
-        else:
-            self.scoring_agent = None
-            print(f"✅ Working Diagnostic Agent initialized - interface: {interface}")
+        return self.scoring_agent
+    
+    def _get_scoring_crew(self):
+        """Scoring crew over the shared SCORING_TASK_PROMPT task, created on first call"""
+        if self.scoring_crew is None and self._get_scoring_agent() is not None:
+            scoring_task = Task(
+                description=SCORING_TASK_PROMPT,
+                agent=self.scoring_agent,
+                expected_output="NUMBER|reason"
+            )
+            self.scoring_crew = Crew(
+                agents=[self.scoring_agent],
+                tasks=[scoring_task],
+                verbose=False
+            )
+        return self.scoring_crew
     
     def diagnose(self, alert: Dict) -> Dict:
         """
@@ -76,92 +370,107 @@ Answer with just a number and brief reason.""",
         Returns:
             Comprehensive diagnosis with root cause
         """
-        print(f"\n🔬 Starting REAL diagnostic investigation...")
-        print(f"📊 Alert status: {alert['status']}\n")
-        
-        # Step 1: ALWAYS run diagnostic tools (no LLM needed)
-        print("="*70)
-        print("STEP 1: Running diagnostic tools...")
-        print("="*70)
-        
-        results = {}
-        
-        # Tool 1: Ping multiple targets
-        print("\n🔧 Tool 1: ping_multiple_targets")
-        try:
-            ping_result = ping_multiple_targets("router,8.8.8.8,1.1.1.1")
-            results['ping_multiple'] = json.loads(ping_result)
-            print(f"   ✅ Completed - tested {len(results['ping_multiple']['results'])} targets")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['ping_multiple'] = {'success': False, 'error': str(e)}
+        # Status lines are buffered and written in batches rather than one
+        # print per line, so the concurrent tools never contend on stdout
+        log = self._new_log()
+        log += [
+            f"\n🔬 Starting REAL diagnostic investigation...",
+            f"📊 Alert status: {alert['status']}\n",
+            # Step 1: ALWAYS run diagnostic tools (no LLM needed)
+            "="*70,
+            "STEP 1: Running diagnostic tools...",
+            "="*70
+        ]
+        _flush(log)
+        
+        # Fast path: the monitor already sees a healthy network, so confirm
+        # with a short router ping and skip traceroute/wifi scan/DNS/ARP
+        if self._looks_healthy(alert):
+            confirm = _safe(ping_multiple_targets, "router", None, 2)
+            pings = _summarize_pings(confirm)
+            if pings.router_latency and pings.router_latency < self.HEALTHY_PING_MS:
+                log.append(f"\n⚡ Healthy alert confirmed by router ping ({pings.router_latency}ms) - skipping full diagnostics")
+                return self.analyze_with_rules(alert, {'ping_multiple': confirm}, log)
+            log.append("\n⚠️  Router ping did not confirm healthy alert - running full diagnostics")
+        
+        tools = {
+            'ping_multiple': (ping_multiple_targets, ("router,8.8.8.8,1.1.1.1",)),
+            'traceroute': (run_traceroute, ("8.8.8.8",)),
+            'wifi_scan': (scan_wifi_channels, (self.interface,)),
+            'dns_check': (self._check_dns, ()),
+            'arp_table': (self._cached, ('arp_table', self.ARP_CACHE_TTL, check_arp_table)),
+        }
         
-        # Tool 2: Traceroute
-        print("\n🔧 Tool 2: run_traceroute")
-        try:
-            trace_result = run_traceroute("8.8.8.8")
-            results['traceroute'] = json.loads(trace_result)
-            if results['traceroute'].get('success'):
-                print(f"   ✅ Completed - traced {results['traceroute']['total_hops']} hops")
-            else:
-                print(f"   ⚠️  {results['traceroute'].get('error')}")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['traceroute'] = {'success': False, 'error': str(e)}
+        # Tools are independent and subprocess-bound: run them all at once so
+        # wall time is the slowest tool (traceroute), not the sum of all five
+        order = {name: i for i, name in enumerate(tools, 1)}
         
-        # Tool 3: WiFi scan
-        print("\n🔧 Tool 3: scan_wifi_channels")
-        try:
-            wifi_result = scan_wifi_channels(self.interface)
-            results['wifi_scan'] = json.loads(wifi_result)
-            if results['wifi_scan'].get('success'):
-                print(f"   ✅ Completed - found {results['wifi_scan']['networks_found']} networks")
+        def report(name, result):
+            tool_name, summarize = _TOOL_REPORTS[name]
+            if result.get('success'):
+                status = f"   ✅ Completed - {summarize(result)}"
             else:
-                print(f"   ⚠️  {results['wifi_scan'].get('error')}")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['wifi_scan'] = {'success': False, 'error': str(e)}
+                status = f"   ⚠️  {result.get('error', 'Failed')}"
+            log.append(f"\n🔧 Tool {order[name]}: {tool_name}")
+            log.append(status)
         
-        # Tool 4: DNS check
-        print("\n🔧 Tool 4: check_dns_servers")
-        try:
-            dns_result = check_dns_servers()
-            results['dns_check'] = json.loads(dns_result)
-            if results['dns_check'].get('success'):
-                print(f"   ✅ Completed - tested {len(results['dns_check']['dns_servers'])} DNS servers")
-            else:
-                print(f"   ⚠️  Failed")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['dns_check'] = {'success': False, 'error': str(e)}
+        results = {}
+        futures = {SHARED_POOL.submit(_safe, fn, *args): name for name, (fn, args) in tools.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            results[name] = future.result()
+            report(name, results[name])
         
-        # Tool 5: ARP table
-        print("\n🔧 Tool 5: check_arp_table")
-        try:
-            arp_result = check_arp_table()
-            results['arp_table'] = json.loads(arp_result)
-            if results['arp_table'].get('success'):
-                print(f"   ✅ Completed - found {results['arp_table']['total_devices']} devices")
-            else:
-                print(f"   ⚠️  Failed")
-        except Exception as e:
-            print(f"   ❌ Failed: {e}")
-            results['arp_table'] = {'success': False, 'error': str(e)}
+        # Keep the result dict in tool order for downstream consumers
+        results = {name: results[name] for name in tools}
         
         # Step 2: Analyze with PYTHON RULES (not LLM)
-        print("\n" + "="*70)
-        print("STEP 2: Analyzing results with rule-based logic...")
-        print("="*70)
+        log.append("\n" + "="*70)
+        log.append("STEP 2: Analyzing results with rule-based logic...")
+        log.append("="*70)
         
-        diagnosis = self.analyze_with_rules(alert, results)
+        diagnosis = self.analyze_with_rules(alert, results, log)
         
         return diagnosis
     
-    def analyze_with_rules(self, alert: Dict, results: Dict) -> Dict:
+    def _looks_healthy(self, alert: Dict) -> bool:
+        """Whether the monitor's own metrics are clearly within healthy thresholds"""
+        if alert.get('status') != 'healthy':
+            return False
+        metrics = alert.get('metrics') or {}
+        ping_latency = (metrics.get('ping') or {}).get('latency_ms')
+        signal_dbm = (metrics.get('signal') or {}).get('signal_dbm')
+        return (ping_latency is not None and ping_latency < self.HEALTHY_PING_MS
+                and signal_dbm is not None and signal_dbm > self.HEALTHY_SIGNAL_DBM)
+    
+    def _cached(self, name: str, ttl: float, fn) -> Dict:
+        """Run a tool through the TTL cache, keyed per interface"""
+        return self._cache.get_or_compute((name, self.interface), ttl, lambda: _safe(fn))
+    
+    def _check_dns(self) -> Dict:
+        """Time a DNS lookup, reusing the gateway server and resolver for DNS_SETUP_TTL"""
+        expires_at, server, resolver = self._dns_setup
+        if time.monotonic() >= expires_at:
+            import dns.resolver
+            
+            gateway = _lookup_default_gateway()
+            server = gateway[0] if gateway else '192.168.50.1'
+            resolver = dns.resolver.Resolver()
+            resolver.nameservers = [server]
+            resolver.timeout = 2
+            resolver.lifetime = 2
+            self._dns_setup = (time.monotonic() + self.DNS_SETUP_TTL, server, resolver)
+        return check_dns_servers(server, resolver)
+    
+    def analyze_with_rules(self, alert: Dict, results: Dict, log: list = None, ai_scoring: bool = True) -> Dict:
         """
         Use rule-based logic to diagnose the issue
         Much more reliable than small LLM!
+        
+        Status lines are appended to `log` (and flushed) if given
         """
+        if log is None:
+            log = self._new_log()
         metrics = alert.get('metrics', {})
         warnings = alert.get('warnings', [])
         
@@ -176,90 +485,55 @@ Answer with just a number and brief reason.""",
             'diagnostic_data': results
         }
         
-        # Extract key metrics
-        ping_latency = metrics.get('ping', {}).get('latency_ms', 0)
-        signal_dbm = metrics.get('signal', {}).get('signal_dbm', 0)
-        dns_latency = metrics.get('dns', {}).get('latency_ms', 0)
+        # Extract key metrics - each section and tool result is looked up once
+        ping_m = metrics.get('ping') or {}
+        signal_m = metrics.get('signal') or {}
+        dns_m = metrics.get('dns') or {}
+        ping_latency = ping_m.get('latency_ms', 0)
+        signal_dbm = signal_m.get('signal_dbm', 0)
+        dns_latency = dns_m.get('latency_ms', 0)
+        
+        ping_multiple = results.get('ping_multiple') or {}
+        wifi_scan = results.get('wifi_scan') or {}
+        
+        # Router vs internet latency, shared by every rule below
+        pings = _summarize_pings(ping_multiple)
         
         # Rule 1: Check ping multiple targets results
-        if results.get('ping_multiple', {}).get('success'):
-            ping_results = results['ping_multiple']['results']
-            
-            router_latency = None
-            internet_latency = []
-            
-            for result in ping_results:
-                if 'router' in result.get('target', '').lower() or result['target'].startswith('192.168'):
-                    router_latency = result.get('latency_ms', 0) or 0  # Handle None
-                else:
-                    latency = result.get('latency_ms', 0)
-                    # Ensure we never append None
-                    internet_latency.append(latency if latency is not None else 0)
+        if ping_multiple.get('success'):
+            router_latency = pings.router_latency
+            avg_internet_latency = pings.avg_internet
             
-            # Filter out any None values and calculate average
-            valid_latencies = [lat for lat in internet_latency if lat is not None]
-            avg_internet_latency = sum(valid_latencies) / len(valid_latencies) if valid_latencies else 0
+            log.append(f"\n📊 Latency Analysis:")
+            log.append(f"   Router: {router_latency}ms" if router_latency else "   Router: not tested")
+            log.append(f"   Internet: {avg_internet_latency:.1f}ms avg")
+            log.append(f"   Monitor reported: {ping_latency}ms")
             
-            print(f"\n📊 Latency Analysis:")
-            print(f"   Router: {router_latency}ms" if router_latency else "   Router: not tested")
-            print(f"   Internet: {avg_internet_latency:.1f}ms avg")
-            print(f"   Monitor reported: {ping_latency}ms")
-            
-            # RULE: High router latency = local network issue
-            if router_latency and router_latency > 100:
-                diagnosis['primary_issue'] = 'high_local_network_latency'
-                diagnosis['root_cause'] = f'Router latency is high ({router_latency}ms), indicating local network congestion or WiFi issues'
-                diagnosis['confidence'] = 'high'
-                diagnosis['evidence'].append(f'Router latency: {router_latency}ms (threshold: 50ms)')
+            # Classify the latencies once, then apply the matching rule's text
+            rule = _match_latency_rule(router_latency, avg_internet_latency)
+            if rule:
+                fields = {'router': router_latency, 'internet': avg_internet_latency, 'signal': signal_dbm}
+                evidence = rule['evidence']
+                recommendations = rule['recommendations']
                 
-                # Check WiFi as secondary cause
-                if signal_dbm and signal_dbm < -70:
-                    diagnosis['evidence'].append(f'WiFi signal is weak: {signal_dbm}dBm')
-                    diagnosis['recommendations'].extend([
-                        'Move closer to WiFi router',
-                        'Switch to 5GHz band if available',
-                        'Check for WiFi interference'
-                    ])
-                else:
-                    diagnosis['recommendations'].extend([
-                        'Check router CPU/memory usage',
-                        'Restart router',
-                        'Reduce number of connected devices'
-                    ])
-            
-            # RULE: Router fast but internet slow = ISP/routing issue
-            elif router_latency and router_latency < 50 and avg_internet_latency > 200:
-                diagnosis['primary_issue'] = 'high_external_latency'
-                diagnosis['root_cause'] = f'Router is responsive ({router_latency}ms) but external hosts are slow ({avg_internet_latency:.0f}ms avg), indicating ISP or internet routing issues'
-                diagnosis['confidence'] = 'high'
-                diagnosis['evidence'].append(f'Router: {router_latency}ms (fast)')
-                diagnosis['evidence'].append(f'Internet: {avg_internet_latency:.0f}ms (slow)')
-                diagnosis['recommendations'].extend([
-                    'Contact ISP about latency issues',
-                    'Check if other users on network experiencing same issue',
-                    'Try wired connection to rule out WiFi'
-                ])
-            
-            # RULE: Everything moderately slow = WiFi quality
-            elif router_latency and 50 < router_latency < 150:
-                diagnosis['primary_issue'] = 'moderate_network_degradation'
-                diagnosis['root_cause'] = 'Moderate latency across local and external hosts, likely WiFi signal quality or interference'
-                diagnosis['confidence'] = 'medium'
-                diagnosis['evidence'].append(f'Router: {router_latency}ms (moderate)')
-                diagnosis['evidence'].append(f'Signal: {signal_dbm}dBm')
+                # Weak WiFi as the secondary cause changes the advice
+                if 'weak_signal' in rule and signal_dbm and signal_dbm < -70:
+                    evidence, recommendations = rule['weak_signal']
+                    evidence = rule['evidence'] + evidence
+                
+                diagnosis['primary_issue'] = rule['issue']
+                diagnosis['root_cause'] = rule['root_cause'].format(**fields)
+                diagnosis['confidence'] = rule['confidence']
+                diagnosis['evidence'].extend(e.format(**fields) for e in evidence)
                 
                 # Check WiFi congestion
-                if results.get('wifi_scan', {}).get('success'):
-                    networks = results['wifi_scan'].get('networks_found', 0)
+                if rule.get('check_congestion') and wifi_scan.get('success'):
+                    networks = wifi_scan.get('networks_found', 0)
                     if networks > 20:
                         diagnosis['evidence'].append(f'{networks} WiFi networks detected (congested environment)')
                         diagnosis['recommendations'].append('Switch to less congested WiFi channel')
                 
-                diagnosis['recommendations'].extend([
-                    'Improve WiFi signal strength',
-                    'Switch to 5GHz band',
-                    'Move closer to router'
-                ])
+                diagnosis['recommendations'].extend(recommendations)
         
         # Rule 2: Check DNS performance
         if dns_latency > 1000:
@@ -268,14 +542,7 @@ Answer with just a number and brief reason.""",
         
         # Rule 3: Check WiFi signal if available
         if signal_dbm:
-            if signal_dbm >= -50:
-                quality = "excellent"
-            elif signal_dbm >= -60:
-                quality = "good"
-            elif signal_dbm >= -70:
-                quality = "fair"
-            else:
-                quality = "weak"
+            quality = _signal_quality(signal_dbm)
             
             diagnosis['evidence'].append(f'WiFi signal: {signal_dbm}dBm ({quality})')
             
@@ -284,18 +551,8 @@ Answer with just a number and brief reason.""",
         
         # Check if network is actually healthy (no problems found)
         if not diagnosis['root_cause']:
-            # Get router/internet latency to determine if healthy
-            router_latency = None
-            internet_latencies = []
-            
-            if results.get('ping_multiple', {}).get('success'):
-                for result in results['ping_multiple']['results']:
-                    if 'router' in result.get('target', '').lower() or result['target'].startswith('192.168'):
-                        router_latency = result.get('latency_ms', 0)
-                    else:
-                        internet_latencies.append(result.get('latency_ms', 0))
-            
-            avg_internet = sum(internet_latencies) / len(internet_latencies) if internet_latencies else 0
+            router_latency = pings.router_latency
+            avg_internet = pings.avg_internet
             
             # If metrics are good, network is healthy!
             if router_latency and router_latency < 50 and avg_internet < 100 and signal_dbm > -70:
@@ -311,19 +568,48 @@ Answer with just a number and brief reason.""",
                 diagnosis['recommendations'].append('Monitor network performance over time')
         
         # Generate AI health score if LLM available
-        if self.enable_ai_scoring:
+        if self.enable_ai_scoring and ai_scoring:
+            # Scoring may print live progress, so get ours out first
+            _flush(log)
             try:
-                score, explanation = self._generate_ai_health_score(diagnosis, results, metrics)
+                score, explanation = self._generate_ai_health_score(diagnosis, pings, metrics)
                 diagnosis['network_health_score'] = score
                 diagnosis['score_explanation'] = explanation
-                print(f"\n🤖 AI Health Score: {score}/100 - {explanation}")
+                log.append(f"\n🤖 AI Health Score: {score}/100 - {explanation}")
             except Exception as e:
-                print(f"\n⚠️  AI scoring failed: {e}")
+                log.append(f"\n⚠️  AI scoring failed: {e}")
                 # Don't break - diagnosis still works without score
         
+        _flush(log)
         return diagnosis
     
-    def _generate_ai_health_score(self, diagnosis: Dict, results: Dict, metrics: Dict) -> tuple:
+    def analyze_batch(self, records: list) -> list:
+        """
+        Re-run the rules over stored (alert, diagnostic results) pairs,
+        e.g. when replaying an alert log
+        
+        Nothing is printed and each diagnosis is scored from the score
+        buckets instead of one LLM call per alert.
+        """
+        diagnoses = []
+        for alert, results in records:
+            diagnosis = self.analyze_with_rules(alert, results, log=_DiscardLog(), ai_scoring=False)
+            
+            metrics = alert.get('metrics') or {}
+            pings = _summarize_pings(results.get('ping_multiple') or {})
+            score, explanation = self._fallback_health_score(
+                pings.router_latency or 0,
+                pings.first_internet,
+                (metrics.get('signal') or {}).get('signal_dbm', 0),
+                (metrics.get('ping') or {}).get('packet_loss', 0)
+            )
+            diagnosis['network_health_score'] = score
+            diagnosis['score_explanation'] = explanation
+            diagnoses.append(diagnosis)
+        
+        return diagnoses
+    
+    def _generate_ai_health_score(self, diagnosis: Dict, pings: PingSummary, metrics: Dict) -> tuple:
         """
         Generate AI health score (0-100) using CrewAI framework
         Simple and fast like the solution agent!
@@ -331,47 +617,27 @@ Answer with just a number and brief reason.""",
         Returns:
             (score, explanation) tuple
         """
-        if not self.scoring_agent:
-            return 50, "AI scoring not available"
-        
-        # Get router/internet latency from results
-        router_latency = 0
-        internet_latency = 0
-        if results.get('ping_multiple', {}).get('success'):
-            for result in results['ping_multiple']['results']:
-                if 'router' in result.get('target', '').lower() or result['target'].startswith('192.168'):
-                    router_latency = result.get('latency_ms', 0)
-                elif result.get('success'):
-                    internet_latency = result.get('latency_ms', 0)
-                    break
-        
-        signal = metrics.get('signal', {})
-        signal_dbm = signal.get('signal_dbm', 0)
-        packet_loss = metrics.get('ping', {}).get('packet_loss', 0)
-        
-        # Create scoring task with clear guidance
-        scoring_task = Task(
-            description=f"""Score this network 0-100:
-- Router: {router_latency:.0f}ms (Good: <50, Bad: >100)
-- Internet: {internet_latency:.0f}ms (Good: <100, Bad: >200)
-- WiFi: {signal_dbm}dBm (Good: >-60, Bad: <-70)
-
-Give ONE number 0-100 and short reason.
-Format: NUMBER|reason
-Example: 85|fast router, good signal
-
-Your score:""",
-            agent=self.scoring_agent,
-            expected_output="NUMBER|reason"
-        )
+        router_latency = pings.router_latency or 0
+        internet_latency = pings.first_internet
+        
+        signal_dbm = (metrics.get('signal') or {}).get('signal_dbm', 0)
+        packet_loss = (metrics.get('ping') or {}).get('packet_loss', 0)
+        
+        # Obvious cases (and anything the rules were confident about) don't
+        # need an LLM round-trip - the bucket score is the answer
+        score, issues, unambiguous = _bucket_score(router_latency, internet_latency, signal_dbm, packet_loss)
+        if unambiguous or diagnosis.get('confidence') != 'low':
+            return score, ", ".join(issues) if issues else "Network performing well"
+        
+        crew = self._get_scoring_crew()
+        if crew is None:
+            self.enable_ai_scoring = False
+            return score, f"Rule-based: {', '.join(issues) if issues else 'Network performing well'}"
         
         try:
             # Run CrewAI scoring with progress indicator
-            import threading
-            import time
-            
             start = time.time()
-            print(f"\n   🤖 AI scoring...")
+            self._say(f"\n   🤖 AI scoring...")
             
             # Progress indicator thread
             stop_progress = threading.Event()
@@ -382,48 +648,37 @@ Your score:""",
                     if not stop_progress.is_set():
                         dots = (dots + 1) % 4
                         elapsed = time.time() - start
-                        print(f"   ⏳ Still working{'.' * (dots + 1)} ({elapsed:.1f}s)")
+                        self._say(f"   ⏳ Still working{'.' * (dots + 1)} ({elapsed:.1f}s)")
             
             progress_thread = threading.Thread(target=show_progress, daemon=True)
             progress_thread.start()
             
+            # Kickoff runs on a daemon thread so a hung LLM can't block the
+            # diagnosis past scoring_timeout, nor the process from exiting
             try:
-                crew_start = time.time()
-                crew = Crew(
-                    agents=[self.scoring_agent],
-                    tasks=[scoring_task],
-                    verbose=False
-                )
-                print(f"   ⏱️  Crew created in {time.time() - crew_start:.2f}s")
-                
                 kickoff_start = time.time()
-                result = crew.kickoff()
-                print(f"   ⏱️  Kickoff took {time.time() - kickoff_start:.2f}s")
+                result = _call_with_timeout(self.scoring_timeout, crew.kickoff, inputs={
+                    'router': f"{router_latency:.0f}",
+                    'internet': f"{internet_latency:.0f}",
+                    'signal': signal_dbm
+                })
+                self._say(f"   ⏱️  Kickoff took {time.time() - kickoff_start:.2f}s")
                 response = str(result).strip()
             finally:
                 # Stop progress indicator
                 stop_progress.set()
                 progress_thread.join(timeout=0.1)
             
-            # Simple parsing: look for "NUMBER|text" format
+            # Expected "NUMBER|reason"; otherwise take the first 0-100 number
             score = None
-            explanation = "AI scoring"
-            
-            if '|' in response:
-                parts = response.split('|', 1)
-                nums = ''.join(filter(str.isdigit, parts[0]))
-                if nums:
-                    score = int(nums)
-                    explanation = parts[1].strip()[:100]
-            
-            # If no pipe, just find first number 0-100
+            pipe = response.find('|')
+            if pipe != -1:
+                score, _ = _parse_score(response[:pipe])
+                explanation = response[pipe + 1:]
             if score is None:
-                numbers = re.findall(r'\b(\d{1,3})\b', response)
-                for num in numbers:
-                    if 0 <= int(num) <= 100:
-                        score = int(num)
-                        explanation = response[:100]
-                        break
+                score, _ = _parse_score(response)
+                explanation = response
+            explanation = _MARKDOWN_RE.sub('', explanation).strip()[:100] or "AI scoring"
             
             # Fallback to rule-based if parsing failed
             if score is None:
@@ -439,60 +694,38 @@ Your score:""",
             #     score, explanation = self._fallback_health_score(router_latency, internet_latency, signal_dbm, packet_loss)
             #     explanation = f"Rule-based (AI override): {explanation}"
             
-            print(f"   ✅ Score: {score}/100")
+            self._say(f"   ✅ Score: {score}/100")
             return max(0, min(100, score)), explanation
             
+        except TimeoutError:
+            # The abandoned kickoff may still be using the crew; start fresh next time
+            self.scoring_crew = None
+            self._say(f"   ⚠️  AI scoring timed out after {self.scoring_timeout:.0f}s, using rule-based")
+            return self._fallback_health_score(router_latency, internet_latency, signal_dbm, packet_loss)
+        
         except Exception as e:
             # Fallback to rule-based scoring
-            print(f"   ⚠️  AI scoring failed, using rule-based")
+            self._say(f"   ⚠️  AI scoring failed, using rule-based")
             return self._fallback_health_score(router_latency, internet_latency, signal_dbm, packet_loss)
     
     def _fallback_health_score(self, router_latency, internet_latency, signal_dbm, packet_loss) -> tuple:
         """Rule-based fallback scoring if LLM fails"""
-        score = 100
-        issues = []
-        
-        # Router latency penalty
-        if router_latency > 100:
-            score -= 30
-            issues.append("high router latency")
-        elif router_latency > 50:
-            score -= 15
-            issues.append("moderate router latency")
-        
-        # Internet latency penalty
-        if internet_latency > 200:
-            score -= 20
-            issues.append("high internet latency")
-        elif internet_latency > 100:
-            score -= 10
-        
-        # Signal strength penalty
-        if signal_dbm < -80:
-            score -= 25
-            issues.append("weak WiFi signal")
-        elif signal_dbm < -70:
-            score -= 10
-        
-        # Packet loss penalty
-        if packet_loss > 5:
-            score -= 20
-            issues.append("packet loss")
-        
-        score = max(0, score)
+        score, issues, _ = _bucket_score(router_latency, internet_latency, signal_dbm, packet_loss)
         explanation = ", ".join(issues) if issues else "Network performing well"
         
         return score, explanation
     
     def print_diagnosis(self, diagnosis: Dict):
         """Print diagnosis in readable format"""
-        print("\n" + "="*70)
-        print("🔬 DIAGNOSTIC REPORT (RULE-BASED)")
-        print("="*70)
+        out = [
+            "\n" + "="*70,
+            "🔬 DIAGNOSTIC REPORT (RULE-BASED)",
+            "="*70
+        ]
         
-        print(f"\n📊 Primary Issue: {diagnosis['primary_issue']}")
-        print(f"🎯 Root Cause: {diagnosis['root_cause']}")
-        print(f"📈 Confidence: {diagnosis['confidence'].upper()}")
+        out.append(f"\n📊 Primary Issue: {diagnosis['primary_issue']}")
+        out.append(f"🎯 Root Cause: {diagnosis['root_cause']}")
+        out.append(f"📈 Confidence: {diagnosis['confidence'].upper()}")
         
         # Display AI health score if available
         if 'network_health_score' in diagnosis:
@@ -500,37 +733,26 @@ Your score:""",
             explanation = diagnosis.get('score_explanation', '')
             
             # Choose emoji based on score
-            if score >= 90:
-                emoji = "🟢"
-                rating = "EXCELLENT"
-            elif score >= 70:
-                emoji = "🟡"
-                rating = "GOOD"
-            elif score >= 40:
-                emoji = "🟠"
-                rating = "FAIR"
-            else:
-                emoji = "🔴"
-                rating = "POOR"
+            emoji, rating = _SCORE_RATINGS[bisect_right(_SCORE_RATING_BOUNDS, score)]
             
-            # Create visual bar
-            filled = int(score / 10)
-            bar = "█" * filled + "░" * (10 - filled)
+            # Visual bar, one block per 10 points
+            bar = _HEALTH_BARS[max(0, min(10, int(score) // 10))]
             
-            print(f"\n{emoji} AI Health Score: {score}/100 ({rating})")
-            print(f"   [{bar}] {explanation}")
+            out.append(f"\n{emoji} AI Health Score: {score}/100 ({rating})")
+            out.append(f"   [{bar}] {explanation}")
         
         if diagnosis['evidence']:
-            print(f"\n🔍 Evidence:")
+            out.append(f"\n🔍 Evidence:")
             for evidence in diagnosis['evidence']:
-                print(f"  • {evidence}")
+                out.append(f"  • {evidence}")
         
         if diagnosis['recommendations']:
-            print(f"\n✅ Recommendations:")
+            out.append(f"\n✅ Recommendations:")
             for i, rec in enumerate(diagnosis['recommendations'], 1):
-                print(f"  {i}. {rec}")
+                out.append(f"  {i}. {rec}")
         
-        print("\n" + "="*70)
+        out.append("\n" + "="*70)
+        _flush(out)
 
 
 # ============================================================================
@@ -547,11 +769,13 @@ if __name__ == "__main__":
                         help='Path to alert JSON file (for file mode)')
     parser.add_argument('--interface', default='wlan0',
                         help='Network interface to diagnose (wlan0, eth0, etc.)')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Only print the final diagnosis, not progress while diagnosing')
     
     args = parser.parse_args()
     
     # Initialize diagnostic agent
-    diagnostic = WorkingDiagnosticAgent(interface=args.interface)
+    diagnostic = WorkingDiagnosticAgent(interface=args.interface, verbose=not args.quiet)
     
     if args.mode == 'test':
         # Simulate a high latency alert
@@ -594,8 +818,7 @@ if __name__ == "__main__":
         
         # Save to file
         output_file = '/tmp/diagnostic_result_working.json'
-        with open(output_file, 'w') as f:
-            json.dump(diagnosis, f, indent=2)
+        save_json(diagnosis, output_file)
         print(f"\n💾 Diagnosis saved to: {output_file}")
     
     elif args.mode == 'file':
@@ -604,14 +827,12 @@ if __name__ == "__main__":
             exit(1)
         
         print(f"\n📁 Loading alert from: {args.alert_file}\n")
-        with open(args.alert_file, 'r') as f:
-            alert = json.load(f)
+        alert = load_json(args.alert_file)
         
         diagnosis = diagnostic.diagnose(alert)
         diagnostic.print_diagnosis(diagnosis)
         
         # Save to file
         output_file = '/tmp/diagnostic_result_working.json'
-        with open(output_file, 'w') as f:
-            json.dump(diagnosis, f, indent=2)
+        save_json(diagnosis, output_file)
         print(f"\n💾 Diagnosis saved to: {output_file}")
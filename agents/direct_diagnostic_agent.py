@@ -5,70 +5,221 @@ This version directly calls diagnostic functions instead of relying on CrewAI
 
 import time
 import json
+import os
+import re
+import sys
+import socket
+import asyncio
+import ipaddress
 import subprocess
+from collections import OrderedDict, deque
 from datetime import datetime
 from typing import Dict, List, Optional
 
-# Diagnostic libraries
+from _exec import run_in_pool
+
+# Diagnostic libraries (netifaces, icmplib) are imported inside the tools
+# that use them so importing this module stays cheap - a missing package
+# shows up as that tool's error instead.
+# Install with: pip install netifaces icmplib
+
+# Optional fast JSON parser for alert files
 try:
-    import netifaces
-    from icmplib import ping as icmp_ping
-except ImportError as e:
-    print(f"Missing dependency: {e}")
-    print("Install with: pip install netifaces icmplib")
-    exit(1)
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # ============================================================================
 # DIAGNOSTIC FUNCTIONS - Direct execution
 # ============================================================================
 
-def run_traceroute(target: str = "8.8.8.8", max_hops: int = 15) -> Dict:
+# One traceroute hop line: " 3  host (1.2.3.4)  12.345 ms" or " 4  *"
+_TRACE_RE = re.compile(rb'^\s*(\d+)\s+(\S+)(?:\s+\(\S+\))?(?:\s+([\d.]+)\s*ms)?', re.M)
+
+# /proc/net/arp row: IP address, HW type, Flags, HW address, Mask, Device
+_ARP_PROC_RE = re.compile(rb'^(\S+)[ \t]+\S+[ \t]+\S+[ \t]+(\S+)[ \t]+\S+[ \t]+(\S+)[ \t]*$', re.M)
+
+# `arp -n` row: "<ip> <hwtype> <mac> <flags> [mask] [iface]" or, for
+# unresolved entries, "<ip> (incomplete) [iface]"
+_ARP_CMD_RE = re.compile(
+    rb'^(\d[\d.]*)[ \t]+(?:\(incomplete\)|\S+[ \t]+(\S+)[ \t]+\S+)'
+    rb'(?:[ \t]+(?:\S+[ \t]+)?(\S+))?[ \t]*$',
+    re.M
+)
+
+# On Linux skip the close_fds sweep when spawning arp/traceroute. Tradeoff:
+# the child inherits any fd not marked close-on-exec - Python creates its
+# own fds (files, sockets, pipes) non-inheritable, so only fds opened
+# outside Python could leak into these short-lived, read-only tools.
+_SPAWN_KW = {'close_fds': False} if sys.platform.startswith('linux') else {}
+
+# Ping targets treated as the local router (RFC 1918 ranges)
+_PRIVATE_PREFIXES = ('192.168.', '10.') + tuple(f'172.{n}.' for n in range(16, 32))
+
+# Default gateway IP and when it was looked up (time.monotonic)
+_gateway_cache = {'ip': None, 'ts': 0.0}
+GATEWAY_CACHE_TTL = 30
+
+# Per-target ping results: target -> (time.monotonic() when measured, result).
+# Bursts of alerts re-ping the same targets within seconds; reuse those.
+_ping_cache: Dict[str, tuple] = {}
+PING_CACHE_TTL = 3
+
+
+def clear_cache():
+    """Forget cached ping results and the cached default gateway."""
+    _ping_cache.clear()
+    _gateway_cache['ts'] = 0.0
+
+
+# Upper bound on targets pinged (or resolved) at the same time - scales with
+# cores rather than with the target list, since hundreds of simultaneous
+# probes inflate the measured latency
+MAX_CONCURRENT_PINGS = min(32, (os.cpu_count() or 4) * 4)
+
+
+def _read_default_gateway() -> Optional[str]:
     """
-    Run traceroute to identify where network delays occur.
+    Default IPv4 gateway from a single read of /proc/net/route, falling back
+    to netifaces (which walks every interface) where procfs is unavailable.
     """
     try:
-        result = subprocess.run(
-            ['traceroute', '-m', str(max_hops), '-w', '2', '-q', '1', target],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        with open('/proc/net/route', 'rb') as f:
+            lines = f.read().splitlines()[1:]  # Skip header
+    except OSError:
+        import netifaces
         
-        hops = []
-        lines = result.stdout.strip().split('\n')[1:]  # Skip header
-        
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) >= 3:
-                hop_num = parts[0]
-                if hop_num.isdigit():
-                    hop_data = {
-                        'hop': int(hop_num),
-                        'host': parts[1] if parts[1] != '*' else 'timeout',
-                        'latency_ms': None
-                    }
-                    
-                    # Extract latency - look for numeric value before 'ms'
-                    for i, part in enumerate(parts[2:], start=2):
-                        try:
-                            # Try to parse current part as float
-                            latency = float(part)
-                            # Check if next part is 'ms'
-                            if i + 1 < len(parts) and parts[i + 1] == 'ms':
-                                hop_data['latency_ms'] = round(latency, 2)
-                                break
-                        except ValueError:
-                            # Also handle format like "1.610ms" (no space)
-                            if 'ms' in part and part != 'ms':
-                                try:
-                                    latency = float(part.replace('ms', ''))
-                                    hop_data['latency_ms'] = round(latency, 2)
-                                    break
-                                except ValueError:
-                                    continue
-                    
-                    hops.append(hop_data)
+        default_gateway = netifaces.gateways().get('default', {}).get(netifaces.AF_INET)
+        return default_gateway[0] if default_gateway else None
+    
+    # Iface, Destination, Gateway, Flags, ... - addresses are little-endian hex
+    for line in lines:
+        fields = line.split()
+        if len(fields) > 3 and fields[1] == b'00000000' and int(fields[3], 16) & 0x2:  # RTF_GATEWAY
+            return socket.inet_ntoa(int(fields[2], 16).to_bytes(4, 'little'))
+    return None
+
+
+def _get_default_gateway() -> Optional[str]:
+    """Default IPv4 gateway, re-read from the routing table at most every GATEWAY_CACHE_TTL seconds."""
+    now = time.monotonic()
+    if now - _gateway_cache['ts'] >= GATEWAY_CACHE_TTL:
+        _gateway_cache['ip'] = _read_default_gateway()
+        _gateway_cache['ts'] = now
+    return _gateway_cache['ip']
+
+
+async def _run_command(args: List[str], timeout: float) -> bytes:
+    """
+    Run a command without blocking the event loop and return its raw stdout.
+    Raises subprocess.TimeoutExpired if it runs longer than timeout seconds.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        **_SPAWN_KW
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(args, timeout)
+    return stdout
+
+
+async def iter_traceroute_hops(target: str, max_hops: int = 15, wait: int = 2):
+    """
+    Run the system traceroute and yield each hop as soon as its line is
+    printed, instead of waiting for the whole trace to finish.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        'traceroute', '-f', '1', '-m', str(max_hops), '-w', str(wait), '-q', '1', target,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        **_SPAWN_KW
+    )
+    try:
+        async for line in proc.stdout:
+            m = _TRACE_RE.match(line)  # header line never matches
+            if m:
+                yield {
+                    'hop': int(m.group(1)),
+                    'host': m.group(2).decode() if m.group(2) != b'*' else 'timeout',
+                    'latency_ms': round(float(m.group(3)), 2) if m.group(3) else None
+                }
+        await proc.wait()
+    finally:
+        # Caller stopped early or timed out - don't leave traceroute running
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+# Seconds the traceroute binary may run before we settle for the hops seen so far
+TRACEROUTE_DEADLINE = 15
+
+
+async def _traceroute_subprocess(target: str, max_hops: int, wait: int) -> List[Dict]:
+    """
+    Fallback traceroute using the system binary (no raw socket access needed).
+    Hops are collected as they stream in, so hitting the deadline still
+    returns the partial path; it only fails if no hop arrived at all.
+    """
+    hops = []
+    
+    async def collect():
+        async for hop in iter_traceroute_hops(target, max_hops, wait):
+            hops.append(hop)
+    
+    try:
+        await asyncio.wait_for(collect(), timeout=TRACEROUTE_DEADLINE)
+    except asyncio.TimeoutError:
+        if not hops:
+            raise subprocess.TimeoutExpired('traceroute', TRACEROUTE_DEADLINE)
+    return hops
+
+
+def _traceroute_limits(target: str, max_hops: int) -> tuple:
+    """
+    (max_hops, per-hop wait seconds) for a trace to target. A LAN address is
+    only a few hops away; for internet targets cap the path length and give
+    up on silent middle hops after 1s instead of 2s.
+    """
+    try:
+        if ipaddress.ip_address(target).is_private:
+            return min(max_hops, 5), 2
+    except ValueError:
+        pass  # hostname - treat as an internet target
+    return min(max_hops, 20), 1
+
+
+async def async_run_traceroute(target: str = "8.8.8.8", max_hops: int = 15) -> Dict:
+    """
+    Coroutine version of run_traceroute.
+    """
+    max_hops, wait = _traceroute_limits(target, max_hops)
+    
+    try:
+        from icmplib import traceroute as icmp_traceroute, SocketPermissionError
+        
+        try:
+            # Native ICMP traceroute - no fork/exec, no text parsing. icmplib
+            # has no async traceroute, so keep it off the event loop thread.
+            # fast=True moves on to the next TTL as soon as a hop answers
+            trace = await run_in_pool(icmp_traceroute, target, count=1, max_hops=max_hops,
+                                      timeout=wait, fast=True)
+            hops = [{
+                'hop': hop.distance,
+                'host': hop.address,
+                'latency_ms': round(hop.avg_rtt, 2)
+            } for hop in trace]
+        except SocketPermissionError:
+            # icmplib needs raw sockets for traceroute, so fall back to the
+            # system binary when not running as root / with CAP_NET_RAW
+            hops = await _traceroute_subprocess(target, max_hops, wait)
         
         return {
             'success': True,
@@ -91,23 +242,118 @@ def run_traceroute(target: str = "8.8.8.8", max_hops: int = 15) -> Dict:
         }
 
 
-def ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1") -> Dict:
+def run_traceroute(target: str = "8.8.8.8", max_hops: int = 15) -> Dict:
     """
-    Ping multiple targets to isolate where the problem is.
+    Run traceroute to identify where network delays occur.
+    """
+    return asyncio.run(async_run_traceroute(target, max_hops))
+
+
+def _collect_replies(sock, sent: Dict, rtts: Dict, deadline: float, wait_all: bool):
+    """
+    Read echo replies off sock until deadline, matching each one to its
+    request by (source address, sequence). Stops early once nothing is
+    outstanding unless wait_all (used to keep the gap between rounds).
+    """
+    from icmplib import TimeoutExpired
+    
+    while wait_all or sent:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            reply = sock.receive(None, remaining)
+        except TimeoutExpired:
+            break
+        # ICMP errors (unreachable, time exceeded) from a router could share
+        # a pending echo's (source, sequence) - only echo replies settle one
+        if reply.type != 0:
+            continue
+        sent_at = sent.pop((reply.source, reply.sequence), None)
+        if sent_at is not None:
+            rtts[reply.source].append((reply.time - sent_at) * 1000)
+
+
+def _ping_on_one_socket(addresses: List[str], count: int, interval: float, timeout: float) -> list:
+    """
+    fping-style ping: every echo request to every address goes out on a
+    single ICMP socket, round by round, and replies are matched back by
+    (source, sequence). Returns icmplib Host objects in address order.
+    """
+    from icmplib import ICMPv4Socket, ICMPRequest, Host
+    from icmplib.utils import unique_identifier
+    
+    rtts = {address: [] for address in addresses}
+    
+    with ICMPv4Socket(privileged=False) as sock:
+        ident = unique_identifier()
+        
+        # At most MAX_CONCURRENT_PINGS targets in flight at a time
+        for start in range(0, len(addresses), MAX_CONCURRENT_PINGS):
+            group = addresses[start:start + MAX_CONCURRENT_PINGS]
+            sent = {}  # (address, sequence) -> send time
+            
+            for sequence in range(count):
+                for address in group:
+                    request = ICMPRequest(destination=address, id=ident, sequence=sequence)
+                    sock.send(request)
+                    sent[(address, sequence)] = request.time
+                
+                last_round = sequence == count - 1
+                _collect_replies(
+                    sock, sent, rtts,
+                    deadline=time.time() + (timeout if last_round else interval),
+                    wait_all=not last_round
+                )
+    
+    return [Host(address, count, rtts[address]) for address in addresses]
+
+
+def _is_ip_address(target: str) -> bool:
+    """Whether target is a literal IPv4/IPv6 address rather than a hostname"""
+    try:
+        ipaddress.ip_address(target)
+        return True
+    except ValueError:
+        return False
+
+
+async def _resolve_hosts(hostnames: List[str]) -> Dict[str, Optional[str]]:
+    """Resolve hostnames to IPv4 addresses concurrently (None if lookup failed)"""
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(MAX_CONCURRENT_PINGS)
+    
+    async def resolve(name):
+        async with sem:
+            return await loop.getaddrinfo(name, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+    
+    answers = await asyncio.gather(*(resolve(name) for name in hostnames), return_exceptions=True)
+    return {
+        name: None if isinstance(info, Exception) or not info else info[0][4][0]
+        for name, info in zip(hostnames, answers)
+    }
+
+
+async def async_ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1", gateway: str = None) -> Dict:
+    """
+    Coroutine version of ping_multiple_targets.
     """
     try:
+        from icmplib import async_multiping
+        
         target_list = targets.split(',')
         results = []
+        addresses = []
+        now = time.monotonic()
         
         for target in target_list:
             target = target.strip()
             
             # Special handling for 'router' - get gateway IP
             if target.lower() == 'router':
-                gateways = netifaces.gateways()
-                default_gateway = gateways.get('default', {}).get(netifaces.AF_INET)
-                if default_gateway:
-                    target = default_gateway[0]
+                gateway_ip = gateway or _get_default_gateway()
+                if gateway_ip:
+                    target = gateway_ip
                 else:
                     results.append({
                         'target': 'router',
@@ -116,23 +362,61 @@ def ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1") -> Dict:
                     })
                     continue
             
-            # Ping the target
-            try:
-                result = icmp_ping(target, count=5, timeout=2, privileged=False)
-                results.append({
-                    'target': target,
-                    'success': result.is_alive,
-                    'latency_ms': round(result.avg_rtt * 1000, 2) if result.is_alive else None,
-                    'packet_loss': round(result.packet_loss, 1),
-                    'min_rtt': round(result.min_rtt * 1000, 2) if result.is_alive else None,
-                    'max_rtt': round(result.max_rtt * 1000, 2) if result.is_alive else None
-                })
-            except Exception as e:
-                results.append({
-                    'target': target,
-                    'success': False,
-                    'error': str(e)
-                })
+            cached = _ping_cache.get(target)
+            if cached and now - cached[0] < PING_CACHE_TTL:
+                results.append(dict(cached[1]))
+                continue
+            
+            addresses.append(target)
+            results.append(None)  # Filled in once all pings complete
+        
+        # Look up every hostname at once before pinging, so DNS time is paid
+        # in parallel and never lands inside the latency measurement
+        resolved = await _resolve_hosts([a for a in addresses if not _is_ip_address(a)])
+        
+        to_ping = []
+        pending = iter(addresses)
+        for i, result in enumerate(results):
+            if result is None:
+                target = next(pending)
+                ip = target if _is_ip_address(target) else resolved[target]
+                if ip:
+                    to_ping.append((i, target, ip))
+                else:
+                    results[i] = {
+                        'target': target,
+                        'success': False,
+                        'error': 'Could not resolve host'
+                    }
+        
+        ips = [ip for _, _, ip in to_ping]
+        if not ips:
+            # Everything came from the cache or failed to resolve - no socket needed
+            hosts = []
+        elif all(':' not in ip for ip in ips):
+            # IPv4 only (the usual case): one socket for every probe
+            hosts = await run_in_pool(_ping_on_one_socket, ips, 5, 0.5, 2)
+        else:
+            # Ping every target in one batch instead of one after another,
+            # capping in-flight targets so large lists don't flood the NIC
+            hosts = await async_multiping(
+                ips,
+                count=5,
+                timeout=2,
+                privileged=False,
+                concurrent_tasks=min(MAX_CONCURRENT_PINGS, len(ips))
+            )
+        
+        for (i, target, _), host in zip(to_ping, hosts):
+            results[i] = {
+                'target': target,
+                'success': host.is_alive,
+                'latency_ms': round(host.avg_rtt, 2) if host.is_alive else None,
+                'packet_loss': round(host.packet_loss, 1),
+                'min_rtt': round(host.min_rtt, 2) if host.is_alive else None,
+                'max_rtt': round(host.max_rtt, 2) if host.is_alive else None
+            }
+            _ping_cache[target] = (time.monotonic(), results[i])
         
         return {
             'success': True,
@@ -147,34 +431,63 @@ def ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1") -> Dict:
         }
 
 
-def check_arp_table() -> Dict:
+def ping_multiple_targets(targets: str = "router,8.8.8.8,1.1.1.1", gateway: str = None) -> Dict:
     """
-    Check ARP table to see devices on local network.
+    Ping multiple targets to isolate where the problem is.
+    'router' is replaced by `gateway`, or the cached default gateway when not given.
+    """
+    return asyncio.run(async_ping_multiple_targets(targets, gateway))
+
+
+def _arp_entries_proc() -> Dict[str, list]:
+    """
+    Read the kernel ARP table straight from /proc/net/arp - no fork/exec.
+    """
+    with open('/proc/net/arp', 'rb') as f:
+        data = f.read()
+    
+    # One regex pass over the whole buffer; the header line never matches
+    ips, macs, interfaces = [], [], []
+    for ip, mac, iface in _ARP_PROC_RE.findall(data):
+        ips.append(ip.decode())
+        macs.append(mac.decode() if mac != b'00:00:00:00:00:00' else None)  # incomplete
+        interfaces.append(iface.decode())
+    
+    return {'ips': ips, 'macs': macs, 'interfaces': interfaces}
+
+
+async def _arp_entries_subprocess() -> Dict[str, list]:
+    """
+    Fallback for systems without /proc/net/arp: parse `arp -n` output.
+    """
+    stdout = await _run_command(['arp', '-n'], timeout=5)
+    
+    ips, macs, interfaces = [], [], []
+    for m in _ARP_CMD_RE.finditer(stdout):
+        ips.append(m.group(1).decode())
+        macs.append(m.group(2).decode() if m.group(2) else None)  # None if incomplete
+        interfaces.append(m.group(3).decode() if m.group(3) else None)
+    
+    return {'ips': ips, 'macs': macs, 'interfaces': interfaces}
+
+
+async def async_check_arp_table() -> Dict:
+    """
+    Coroutine version of check_arp_table.
     """
     try:
-        result = subprocess.run(
-            ['arp', '-n'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        entries = []
-        lines = result.stdout.strip().split('\n')[1:]  # Skip header
-        
-        for line in lines:
-            parts = line.split()
-            if len(parts) >= 3:
-                entries.append({
-                    'ip': parts[0],
-                    'mac': parts[2] if parts[2] != '(incomplete)' else None,
-                    'interface': parts[-1] if len(parts) > 4 else None
-                })
+        try:
+            table = _arp_entries_proc()
+        except OSError:
+            # No procfs (some containers, macOS) - ask the arp binary instead
+            table = await _arp_entries_subprocess()
         
+        # Column lists (ips[i], macs[i], interfaces[i] describe one device)
+        # rather than a dict per device
         return {
             'success': True,
-            'entries': entries,
-            'total_devices': len(entries)
+            **table,
+            'total_devices': len(table['ips'])
         }
         
     except Exception as e:
@@ -184,6 +497,31 @@ def check_arp_table() -> Dict:
         }
 
 
+def check_arp_table() -> Dict:
+    """
+    Check ARP table to see devices on local network.
+    """
+    return asyncio.run(async_check_arp_table())
+
+
+async def _gather_diagnostics(ping_targets: str, trace_target: str) -> Dict:
+    """Run the ARP, ping and traceroute tools side by side."""
+    arp, ping, traceroute = await asyncio.gather(
+        async_check_arp_table(),
+        async_ping_multiple_targets(ping_targets),
+        async_run_traceroute(trace_target)
+    )
+    return {'arp': arp, 'ping': ping, 'traceroute': traceroute}
+
+
+def run_all_diagnostics(ping_targets: str = "router,8.8.8.8,1.1.1.1", trace_target: str = "8.8.8.8") -> Dict:
+    """
+    Run every diagnostic tool concurrently - total time is the slowest tool
+    (usually traceroute) rather than the sum of all three.
+    """
+    return asyncio.run(_gather_diagnostics(ping_targets, trace_target))
+
+
 # ============================================================================
 # DIRECT DIAGNOSTIC AGENT CLASS
 # ============================================================================
@@ -194,6 +532,14 @@ class DirectDiagnosticAgent:
     No CrewAI dependency - just direct function calls
     """
     
+    # Number of past diagnoses kept in diagnostic_history
+    HISTORY_SIZE = 128
+    
+    # Reuse a diagnosis for an equivalent alert seen within this many
+    # seconds (a flapping network re-raises the same alert repeatedly)
+    DIAGNOSIS_CACHE_TTL = 60
+    DIAGNOSIS_CACHE_SIZE = 64
+    
     def __init__(self, interface: str = "wlan0"):
         """
         Initialize Direct Diagnostic Agent
@@ -202,7 +548,8 @@ class DirectDiagnosticAgent:
             interface: Network interface to diagnose
         """
         self.interface = interface
-        self.diagnostic_history = []
+        self.diagnostic_history = deque(maxlen=self.HISTORY_SIZE)  # oldest runs drop off
+        self._diag_cache = OrderedDict()  # alert key -> (monotonic time, diagnosis)
         
         print(f"✅ Direct Diagnostic Agent initialized - interface: {interface}")
     
@@ -219,23 +566,27 @@ class DirectDiagnosticAgent:
         print(f"\n🔬 Starting DIRECT diagnostic investigation...")
         print(f"📊 Alert status: {alert['status']}")
         
-        # Execute tools directly
-        results = {}
-        
-        print("\n🔧 STEP 1: Checking ARP table...")
-        arp_result = check_arp_table()
-        results['arp'] = arp_result
-        print(f"   ARP devices found: {arp_result.get('total_devices', 0)}")
-        
-        print("\n🔧 STEP 2: Testing connectivity scope...")
-        ping_result = ping_multiple_targets("router,8.8.8.8,1.1.1.1")
-        results['ping'] = ping_result
-        print(f"   Ping targets tested: {len(ping_result.get('results', []))}")
-        
-        print("\n🔧 STEP 3: Running traceroute...")
-        traceroute_result = run_traceroute("8.8.8.8")
-        results['traceroute'] = traceroute_result
-        print(f"   Traceroute hops: {traceroute_result.get('total_hops', 0)}")
+        key = self._alert_key(alert)
+        cached = self._diag_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.DIAGNOSIS_CACHE_TTL:
+            print("\n♻️  Same alert diagnosed moments ago - reusing that diagnosis")
+            self._diag_cache.move_to_end(key)
+            diagnosis = dict(cached[1], timestamp=datetime.now().isoformat())
+            self.diagnostic_history.append({
+                'timestamp': diagnosis['timestamp'],
+                'alert': alert,
+                'diagnosis': diagnosis,
+                'tool_results': diagnosis['tool_results']
+            })
+            return diagnosis
+        
+        # Execute tools directly - all at once, they are independent
+        print("\n🔧 Running ARP, ping and traceroute checks...")
+        results = run_all_diagnostics("router,8.8.8.8,1.1.1.1", "8.8.8.8")
+        
+        print(f"   ARP devices found: {results['arp'].get('total_devices', 0)}")
+        print(f"   Ping targets tested: {len(results['ping'].get('results', []))}")
+        print(f"   Traceroute hops: {results['traceroute'].get('total_hops', 0)}")
         
         # Analyze results
         diagnosis = self.analyze_results(results, alert)
@@ -248,8 +599,22 @@ class DirectDiagnosticAgent:
             'tool_results': results
         })
         
+        self._diag_cache[key] = (time.monotonic(), diagnosis)
+        self._diag_cache.move_to_end(key)
+        if len(self._diag_cache) > self.DIAGNOSIS_CACHE_SIZE:
+            self._diag_cache.popitem(last=False)
+        
         return diagnosis
     
+    @staticmethod
+    def _alert_key(alert: Dict) -> tuple:
+        """Canonical identity of an alert: status plus the kinds of warnings/issues raised"""
+        return (
+            alert.get('status'),
+            tuple(sorted(w.get('type', '') for w in alert.get('warnings', []))),
+            tuple(sorted(i.get('type', '') for i in alert.get('issues', [])))
+        )
+    
     def analyze_results(self, results: Dict, alert: Dict) -> Dict:
         """
         Analyze the actual tool results to determine root cause
@@ -271,20 +636,15 @@ class DirectDiagnosticAgent:
         internet_ok = False
         
         for ping in ping_results:
-            if ping['target'].startswith('192.168') or ping['target'].startswith('10.'):
+            if ping['target'].startswith(_PRIVATE_PREFIXES):
                 router_ok = ping['success']
             elif ping['target'] in ['8.8.8.8', '1.1.1.1']:
                 internet_ok = ping['success']
         
         # Analyze traceroute results
         traceroute_hops = results['traceroute'].get('hops', [])
-        isp_delay = False
-        if traceroute_hops:
-            # Check if there are significant delays in early hops
-            for hop in traceroute_hops[:5]:  # First 5 hops
-                if hop.get('latency_ms', 0) > 100:
-                    isp_delay = True
-                    break
+        # Significant delay in any of the first 5 hops (silent hops have no latency)
+        isp_delay = any((hop.get('latency_ms') or 0) > 100 for hop in traceroute_hops[:5])
         
         # Determine root cause
         if not local_network_ok:
@@ -324,27 +684,28 @@ class DirectDiagnosticAgent:
         Generate specific recommendations based on root cause
         """
         recommendations = []
+        cause = root_cause.lower()
         
-        if "local network" in root_cause.lower():
+        if "local network" in cause:
             recommendations.append("Check router power and connections")
             recommendations.append("Restart router if possible")
             recommendations.append("Check ethernet/WiFi cable connections")
         
-        elif "router" in root_cause.lower():
+        elif "router" in cause:
             recommendations.append("Ping router directly to confirm connectivity")
             recommendations.append("Check router configuration")
             recommendations.append("Consider router restart")
         
-        elif "ISP" in root_cause.lower():
-            recommendations.append("Contact ISP for service status")
-            recommendations.append("Check ISP service status page")
-            recommendations.append("Try different DNS servers (8.8.8.8, 1.1.1.1)")
-        
-        elif "delay" in root_cause.lower():
+        elif "delay" in cause:
             recommendations.append("Monitor network during peak hours")
             recommendations.append("Consider upgrading internet plan")
             recommendations.append("Check for background downloads/uploads")
         
+        elif "isp" in cause:
+            recommendations.append("Contact ISP for service status")
+            recommendations.append("Check ISP service status page")
+            recommendations.append("Try different DNS servers (8.8.8.8, 1.1.1.1)")
+        
         else:
             recommendations.append("Monitor network for recurring issues")
             recommendations.append("Check for scheduled maintenance")
@@ -368,9 +729,9 @@ class DirectDiagnosticAgent:
         arp = diagnosis['tool_results']['arp']
         print(f"\n📋 ARP Table:")
         print(f"   Devices found: {arp.get('total_devices', 0)}")
-        if arp.get('entries'):
-            for entry in arp['entries'][:5]:  # Show first 5
-                print(f"   - {entry['ip']} -> {entry['mac'] or 'incomplete'}")
+        if arp.get('ips'):
+            for ip, mac in list(zip(arp['ips'], arp['macs']))[:5]:  # Show first 5
+                print(f"   - {ip} -> {mac or 'incomplete'}")
         
         # Ping results
         ping = diagnosis['tool_results']['ping']
@@ -449,8 +810,12 @@ if __name__ == "__main__":
         
         try:
             print(f"\n📁 Loading alert from: {args.alert_file}")
-            with open(args.alert_file, 'r') as f:
-                alert = json.load(f)
+            if orjson is not None:
+                with open(args.alert_file, 'rb') as f:
+                    alert = orjson.loads(f.read())
+            else:
+                with open(args.alert_file, 'r') as f:
+                    alert = json.load(f)
             
             diagnosis = agent.diagnose(alert)
             agent.print_diagnosis_report(diagnosis)
@@ -458,6 +823,6 @@ if __name__ == "__main__":
         except FileNotFoundError:
             print(f"❌ Alert file not found: {args.alert_file}")
             sys.exit(1)
-        except json.JSONDecodeError as e:
+        except json.JSONDecodeError as e:  # orjson's error subclasses this
             print(f"❌ Invalid JSON in alert file: {e}")
             sys.exit(1)
@@ -3,11 +3,62 @@ Flask API Wrapper for Network Monitoring Agents
 Exposes CrewAI agents as REST endpoints for React frontend
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from datetime import datetime
+import atexit
+import functools
+import hashlib
 import json
+import logging
+import logging.handlers
 import os
+import queue
+import time
+import threading
+
+# Optional fast JSON encoder - pipeline responses carry large nested
+# metrics/diagnostic_data dicts
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records as-is; the listener thread does all formatting (same process, nothing is pickled)"""
+    
+    def prepare(self, record):
+        return record
+
+
+# Request-time warnings and errors go through logging: handlers only enqueue
+# the record and a QueueListener thread formats and writes it
+log = logging.getLogger('flask_api')
+log.setLevel(logging.INFO)
+log.propagate = False
+_log_handler = _DeferredQueueHandler(queue.SimpleQueue())
+log.addHandler(_log_handler)
+_log_listener = None
+
+
+def _start_log_listener():
+    """
+    Give this process its own queue and listener thread. Runs at import and
+    again in every forked child - gunicorn's preload_app imports this module
+    in the master, and threads don't survive fork
+    """
+    global _log_listener
+    _log_handler.queue = queue.SimpleQueue()  # drop records copied from the parent
+    _log_listener = logging.handlers.QueueListener(_log_handler.queue, logging.StreamHandler())
+    _log_listener.start()
+
+
+_start_log_listener()
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_start_log_listener)
+atexit.register(lambda: _log_listener.stop())
 
 # Disable CrewAI telemetry for better performance
 os.environ['OTEL_SDK_DISABLED'] = 'true'
@@ -15,11 +66,26 @@ os.environ['OTEL_SDK_DISABLED'] = 'true'
 # Import your existing agents
 from monitor_agent import NetworkMonitor
 from diagnostic_agent_working import WorkingDiagnosticAgent
+from direct_diagnostic_agent import DirectDiagnosticAgent
+from solution_agent import SolutionAgent
 
 # Import CrewAI LLM
 from crewai import LLM
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify()/request.json backed by orjson instead of the stdlib json module"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for React frontend
 
 # Initialize LLM (using Ollama) with speed optimizations
@@ -28,7 +94,9 @@ try:
         model='ollama/qwen2.5:0.5b',
         base_url="http://localhost:11434",
         temperature=0.3,  # Lower = faster, more focused responses
-        # max_tokens=100    # Limit response length for speed
+        max_tokens=256,     # Cap generation - answers are a short numbered list
+        num_ctx=1024,       # Prompts are a few hundred tokens; smaller KV cache than the default
+        keep_alive='30m'    # Keep the model loaded in Ollama between requests
     )
     print("✅ LLM initialized (optimized for speed)")
 except Exception as e:
@@ -37,7 +105,7 @@ except Exception as e:
 
 # Initialize agents with robust error handling
 monitor = None
-diagnostic = None
+solution_agent = None
 
 try:
     if llm:
@@ -49,17 +117,192 @@ except Exception as e:
     print(f"⚠️  Monitor Agent initialization failed: {e}")
     monitor = None
 
-# DON'T create diagnostic agent at startup - create fresh for each request
-# This matches run_pipeline.py behavior and avoids threading issues
-diagnostic = None
+try:
+    if llm:
+        solution_agent = SolutionAgent(llm)
+    else:
+        print("⚠️  Solution Agent skipped (LLM not available)")
+except Exception as e:
+    print(f"⚠️  Solution Agent initialization failed: {e}")
+    solution_agent = None
+
+# The solution agent's crew isn't re-entrant - one kickoff at a time
+_solution_lock = threading.Lock()
+
+# Idle diagnostic agents. A request checks one out for the duration of its
+# diagnosis (building one if none is free), so agents are never used by two
+# threads at once but are reused - with their tool caches - across requests
+_diagnostic_pool = queue.SimpleQueue()
 
 print("✅ Flask API initialized with CrewAI agents")
 
 
+# ============================================================================
+# OFFLINE FALLBACKS
+# ============================================================================
+
+# Fixed parts of the responses used when the network (or the monitor) is
+# down - copied with a fresh 'timestamp' on use, never modified in place
+_OFFLINE_ALERT_TEMPLATE = {
+    'status': 'offline',
+    'warnings': [{'type': 'connectivity', 'message': 'Network appears to be down'}],
+    'issues': [],
+    'metrics': {
+        'ping': {'success': False, 'latency_ms': 0, 'packet_loss': 100},
+        'dns': {'success': False},
+        'signal': {'success': False, 'signal_dbm': 0},
+        'interface': {'up': False},
+        'gateway': {'success': False}
+    }
+}
+
+_OFFLINE_DIAGNOSIS_TEMPLATE = {
+    'alert_status': 'offline',
+    'primary_issue': 'network_offline',
+    'root_cause': 'Network appears to be down or unreachable. Diagnostic tools cannot run without connectivity.',
+    'confidence': 'high',
+    'evidence': ['All network operations failed', 'No connectivity detected'],
+    'recommendations': [
+        'Check if WiFi is enabled on your device',
+        'Verify WiFi adapter is working',
+        'Check if router is powered on',
+        'Try restarting your network adapter'
+    ],
+    'network_health_score': 0,
+    'score_explanation': 'Network is completely offline',
+    'diagnostic_data': {}
+}
+
+
+# ============================================================================
+# RESULT CACHES
+# ============================================================================
+
+# The frontend polls /api/monitor continuously and may re-POST /api/diagnose;
+# calls within the TTL reuse the last result instead of re-running the tools
+MONITOR_CACHE_TTL = 2.0
+DIAGNOSIS_CACHE_TTL = 10.0
+
+_monitor_cache = {'ts': 0.0, 'data': None}
+_monitor_lock = threading.Lock()
+_diagnosis_cache = {}  # alert key -> (time.monotonic() when run, diagnosis)
+_diagnosis_locks = {}  # alert key -> lock held while that alert is being diagnosed
+_diagnosis_locks_guard = threading.Lock()
+
+
+def _check_monitor():
+    """monitor.check_once(), shared by requests arriving within MONITOR_CACHE_TTL"""
+    with _monitor_lock:
+        # Pollers that waited on the lock pick up the result just stored
+        if _monitor_cache['data'] is not None and time.monotonic() - _monitor_cache['ts'] < MONITOR_CACHE_TTL:
+            return _monitor_cache['data']
+        analysis = monitor.check_once()
+        _monitor_cache['ts'] = time.monotonic()
+        _monitor_cache['data'] = analysis
+        return analysis
+
+
+def _diagnose_with_pooled_agent(alert):
+    """Run alert through an agent checked out of _diagnostic_pool"""
+    try:
+        agent = _diagnostic_pool.get_nowait()
+    except queue.Empty:
+        agent = WorkingDiagnosticAgent(interface="wlan0", llm=llm)
+    try:
+        return agent.diagnose(alert)
+    finally:
+        _diagnostic_pool.put(agent)
+
+
+def _cached_diagnosis(key):
+    """Diagnosis stored for an alert key if still within DIAGNOSIS_CACHE_TTL, else None"""
+    cached = _diagnosis_cache.get(key)
+    if cached and time.monotonic() - cached[0] < DIAGNOSIS_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+def _run_diagnosis(alert):
+    """
+    Diagnose alert, reusing a result for the same alert (status plus warning
+    and issue types, as DirectDiagnosticAgent keys it) within DIAGNOSIS_CACHE_TTL
+    """
+    key = DirectDiagnosticAgent._alert_key(alert)
+    diagnosis = _cached_diagnosis(key)
+    if diagnosis is not None:
+        return diagnosis
+    
+    # Miss: only requests for the same alert wait on each other, and the
+    # ones that waited pick up the result just stored
+    with _diagnosis_locks_guard:
+        lock = _diagnosis_locks.setdefault(key, threading.Lock())
+    with lock:
+        diagnosis = _cached_diagnosis(key)
+        if diagnosis is None:
+            diagnosis = _diagnose_with_pooled_agent(alert)
+            _diagnosis_cache[key] = (time.monotonic(), diagnosis)
+        return diagnosis
+
+
+class _TemplateSolutions(Exception):
+    """The LLM reply had no numbered list; carries generate_solutions' generic fallback list"""
+    
+    def __init__(self, solutions: tuple):
+        super().__init__("Using template solutions")
+        self.solutions = solutions
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_solutions(issue: str, root_cause: str, recommendations: tuple) -> tuple:
+    """
+    Solution agent output for a diagnosis, memoized on exactly what goes into
+    its prompt (the issue, root cause and top 3 recommendations)
+    """
+    diagnosis = {
+        'primary_issue': issue,
+        'root_cause': root_cause,
+        'recommendations': list(recommendations)
+    }
+    with _solution_lock:
+        solutions = solution_agent.generate_solutions(diagnosis)
+    solution_data = solutions.get('solutions', {})
+    solution_list = tuple(solution_data.get('solutions_list', []))
+    # Raising keeps an unparseable reply out of the cache - the next request asks the LLM again
+    if solution_data.get('note') == 'Using template solutions':
+        raise _TemplateSolutions(solution_list)
+    return solution_list
+
+
+def _solutions_for(diagnosis) -> list:
+    """Solution list for a diagnosis - memoized unless the LLM reply couldn't be parsed"""
+    try:
+        return list(_cached_solutions(
+            diagnosis.get('primary_issue', 'unknown'),
+            diagnosis.get('root_cause', 'Unknown cause'),
+            tuple(diagnosis.get('recommendations', [])[:3])
+        ))
+    except _TemplateSolutions as fallback:
+        return list(fallback.solutions)
+
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
+def _monitor_response(payload):
+    """
+    JSON response with an ETag over status and metrics only (the timestamp
+    changes every check) - a poll whose If-None-Match matches gets an empty
+    304 instead of the same readings again
+    """
+    response = jsonify(payload)
+    state = app.json.dumps({'status': payload['status'], 'metrics': payload['metrics']})
+    response.set_etag(hashlib.blake2b(state.encode(), digest_size=8).hexdigest())
+    # Always revalidate - a max-age would stop the browser from asking at all
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
 @app.route('/api/monitor', methods=['GET'])
 def get_monitor_status():
     """
@@ -70,7 +313,7 @@ def get_monitor_status():
     try:
         if not monitor:
             # Fallback if LLM not available - still return valid data
-            return jsonify({
+            return _monitor_response({
                 "timestamp": datetime.now().isoformat(),
                 "status": "offline",
                 "metrics": {
@@ -81,7 +324,7 @@ def get_monitor_status():
         
         # Use your existing monitor agent
         try:
-            analysis = monitor.check_once()
+            analysis = _check_monitor()
             
             # Transform to frontend format
             response = {
@@ -92,12 +335,12 @@ def get_monitor_status():
                     "signal": analysis['metrics']['signal']
                 }
             }
-            return jsonify(response)
+            return _monitor_response(response)
             
         except Exception as monitor_error:
             # Monitor failed (likely network is down) - return offline status
-            print(f"⚠️  Monitor check failed (network might be down): {monitor_error}")
-            return jsonify({
+            log.warning("⚠️  Monitor check failed (network might be down): %s", monitor_error)
+            return _monitor_response({
                 "timestamp": datetime.now().isoformat(),
                 "status": "offline",
                 "metrics": {
@@ -107,9 +350,9 @@ def get_monitor_status():
             })
         
     except Exception as e:
-        print(f"❌ Critical error in /api/monitor: {e}")
+        log.exception("❌ Critical error in /api/monitor: %s", e)
         # Even on critical error, return valid JSON (not 500)
-        return jsonify({
+        return _monitor_response({
             "timestamp": datetime.now().isoformat(),
             "status": "error",
             "metrics": {
@@ -119,161 +362,136 @@ def get_monitor_status():
         })
 
 
-@app.route('/api/diagnose', methods=['POST'])
-def run_full_pipeline():
+def _pipeline_stages():
     """
-    Endpoint 2: Run FULL PIPELINE - Monitor → Diagnostic → Solution
-    Just like run_pipeline.py but returns JSON
+    Run Monitor → Diagnostic → Solution, yielding (stage, data) as each step
+    finishes: 'monitor', 'diagnosis', 'solutions', then 'complete'
     """
-    try:
-        import time
-        pipeline_start = time.time()
-        
-        print("\n" + "="*70)
-        print("🚀 RUNNING FULL DIAGNOSTIC PIPELINE VIA API")
-        print("="*70)
-        
-        # STEP 1: Monitor - Get current network status
-        print("\n📡 STEP 1: Monitor Agent - Collecting metrics...")
-        if not monitor:
-            # Create a minimal alert for offline mode
+    pipeline_start = time.time()
+    
+    print("\n" + "="*70)
+    print("🚀 RUNNING FULL DIAGNOSTIC PIPELINE VIA API")
+    print("="*70)
+    
+    # STEP 1: Monitor - Get current network status
+    print("\n📡 STEP 1: Monitor Agent - Collecting metrics...")
+    if not monitor:
+        # Create a minimal alert for offline mode
+        alert = {**_OFFLINE_ALERT_TEMPLATE, 'timestamp': datetime.now().isoformat()}
+    else:
+        try:
+            alert = _check_monitor()
+        except Exception as e:
+            log.warning("   ⚠️  Monitor failed (network might be down): %s", e)
+            # Create offline alert
             alert = {
+                **_OFFLINE_ALERT_TEMPLATE,
                 'timestamp': datetime.now().isoformat(),
-                'status': 'offline',
-                'warnings': [{'type': 'connectivity', 'message': 'Network appears to be down'}],
-                'issues': [],
-                'metrics': {
-                    'ping': {'success': False, 'latency_ms': 0, 'packet_loss': 100},
-                    'dns': {'success': False},
-                    'signal': {'success': False, 'signal_dbm': 0},
-                    'interface': {'up': False},
-                    'gateway': {'success': False}
-                }
+                'warnings': [{'type': 'connectivity', 'message': f'Monitor failed: {str(e)}'}]
             }
-        else:
-            try:
-                alert = monitor.check_once()
-            except Exception as e:
-                print(f"   ⚠️  Monitor failed (network might be down): {e}")
-                # Create offline alert
-                alert = {
-                    'timestamp': datetime.now().isoformat(),
-                    'status': 'offline',
-                    'warnings': [{'type': 'connectivity', 'message': f'Monitor failed: {str(e)}'}],
-                    'issues': [],
-                    'metrics': {
-                        'ping': {'success': False, 'latency_ms': 0, 'packet_loss': 100},
-                        'dns': {'success': False},
-                        'signal': {'success': False, 'signal_dbm': 0},
-                        'interface': {'up': False},
-                        'gateway': {'success': False}
-                    }
-                }
-        
-        print(f"   Status: {alert['status']}")
-        
-        # STEP 2: Diagnostic - Create FRESH agent and run tools + AI scoring
+    
+    print(f"   Status: {alert['status']}")
+    
+    yield 'monitor', {
+        "status": alert['status'],
+        "metrics": alert['metrics']
+    }
+    
+    # STEP 2: Diagnostic - Run tools + AI scoring
+    if alert['status'] == 'offline':
+        # The tools would only run into their timeouts - use the offline diagnosis
+        print("\n🔬 STEP 2: Diagnostic Agent - Skipped (network offline)")
+        diagnosis = {**_OFFLINE_DIAGNOSIS_TEMPLATE, 'timestamp': datetime.now().isoformat()}
+    else:
         print("\n🔬 STEP 2: Diagnostic Agent - Running tools...")
         print("   ⏳ This will take 10-20 seconds...")
         start_time = time.time()
         
         try:
-            # Create fresh diagnostic agent for this request (like run_pipeline.py)
-            fresh_diagnostic = WorkingDiagnosticAgent(interface="wlan0", llm=llm)
-            diagnosis = fresh_diagnostic.diagnose(alert)
+            diagnosis = _run_diagnosis(alert)
             elapsed = time.time() - start_time
             print(f"   ✅ Diagnostic complete in {elapsed:.1f}s")
             print(f"   Issue: {diagnosis.get('primary_issue')}")
             print(f"   Health Score: {diagnosis.get('network_health_score', 'N/A')}/100")
         except Exception as e:
             elapsed = time.time() - start_time
-            print(f"   ⚠️  Diagnostic failed after {elapsed:.1f}s: {e}")
+            log.warning("   ⚠️  Diagnostic failed after %.1fs: %s", elapsed, e)
             # Create minimal diagnosis for offline mode
             diagnosis = {
+                **_OFFLINE_DIAGNOSIS_TEMPLATE,
                 'timestamp': datetime.now().isoformat(),
-                'alert_status': alert['status'],
-                'primary_issue': 'network_offline',
-                'root_cause': f'Network appears to be down or unreachable. Diagnostic tools cannot run without connectivity.',
-                'confidence': 'high',
-                'evidence': ['All network operations failed', 'No connectivity detected'],
-                'recommendations': [
-                    'Check if WiFi is enabled on your device',
-                    'Verify WiFi adapter is working',
-                    'Check if router is powered on',
-                    'Try restarting your network adapter'
-                ],
-                'network_health_score': 0,
-                'score_explanation': 'Network is completely offline',
-                'diagnostic_data': {}
+                'alert_status': alert['status']
             }
+    
+    yield 'diagnosis', {
+        "primary_issue": diagnosis.get('primary_issue'),
+        "root_cause": diagnosis.get('root_cause'),
+        "confidence": diagnosis.get('confidence'),
+        "evidence": diagnosis.get('evidence', []),
+        "health_score": diagnosis.get('network_health_score'),
+        "score_explanation": diagnosis.get('score_explanation'),
+        "diagnostic_data": diagnosis.get('diagnostic_data', {})
+    }
+    
+    # STEP 3: Solution - Generate recommendations
+    print("\n💡 STEP 3: Solution Agent - Generating recommendations...")
+    print("   ⏳ AI is thinking (5-10 seconds)...")
+    start_time = time.time()
+    
+    try:
+        if solution_agent and diagnosis.get('primary_issue') != 'network_offline':
+            solution_list = _solutions_for(diagnosis)
+        else:
+            # Fallback to diagnostic recommendations
+            solution_list = diagnosis.get('recommendations', [])
         
-        # STEP 3: Solution - Generate recommendations
-        print("\n💡 STEP 3: Solution Agent - Generating recommendations...")
-        print("   ⏳ AI is thinking (5-10 seconds)...")
-        start_time = time.time()
-        
-        try:
-            from solution_agent import SolutionAgent
-            solution_agent = SolutionAgent(llm) if llm else None
-            
-            if solution_agent and diagnosis.get('primary_issue') != 'network_offline':
-                solutions = solution_agent.generate_solutions(diagnosis)
-                solution_list = solutions.get('solutions', {}).get('solutions_list', [])
+        elapsed = time.time() - start_time
+        print(f"   ✅ Solutions generated in {elapsed:.1f}s")
+        print(f"   Generated {len(solution_list)} solutions")
+    except Exception as e:
+        elapsed = time.time() - start_time
+        log.warning("   ⚠️  Solution generation failed after %.1fs: %s", elapsed, e)
+        # Use diagnostic recommendations as fallback
+        solution_list = diagnosis.get('recommendations', ['Check network connectivity'])
+    
+    yield 'solutions', {
+        "recommendations": solution_list[:7],  # Top 7 unique solutions
+        "total": len(solution_list)
+    }
+    
+    # Calculate total time
+    total_time = time.time() - pipeline_start
+    
+    print("\n✅ Pipeline complete!")
+    print(f"⏱️  Total pipeline time: {total_time:.1f} seconds")
+    print("="*70)
+    
+    yield 'complete', {
+        "timestamp": diagnosis['timestamp'],
+        "pipeline_complete": True
+    }
+
+
+@app.route('/api/diagnose', methods=['POST'])
+def run_full_pipeline():
+    """
+    Endpoint 2: Run FULL PIPELINE - Monitor → Diagnostic → Solution
+    Just like run_pipeline.py but returns JSON
+    """
+    try:
+        # Build comprehensive response: monitor, diagnosis and solutions
+        # sections plus the completion fields
+        response = {}
+        for stage, data in _pipeline_stages():
+            if stage == 'complete':
+                response.update(data)
             else:
-                # Fallback to diagnostic recommendations
-                solution_list = diagnosis.get('recommendations', [])
-            
-            elapsed = time.time() - start_time
-            print(f"   ✅ Solutions generated in {elapsed:.1f}s")
-            print(f"   Generated {len(solution_list)} solutions")
-        except Exception as e:
-            elapsed = time.time() - start_time
-            print(f"   ⚠️  Solution generation failed after {elapsed:.1f}s: {e}")
-            # Use diagnostic recommendations as fallback
-            solution_list = diagnosis.get('recommendations', ['Check network connectivity'])
-        
-        # Build comprehensive response
-        response = {
-            "timestamp": diagnosis['timestamp'],
-            "pipeline_complete": True,
-            
-            # Monitor data
-            "monitor": {
-                "status": alert['status'],
-                "metrics": alert['metrics']
-            },
-            
-            # Diagnostic data  
-            "diagnosis": {
-                "primary_issue": diagnosis.get('primary_issue'),
-                "root_cause": diagnosis.get('root_cause'),
-                "confidence": diagnosis.get('confidence'),
-                "evidence": diagnosis.get('evidence', []),
-                "health_score": diagnosis.get('network_health_score'),
-                "score_explanation": diagnosis.get('score_explanation'),
-                "diagnostic_data": diagnosis.get('diagnostic_data', {})
-            },
-            
-            # Solution data
-            "solutions": {
-                "recommendations": solution_list[:7],  # Top 7 unique solutions
-                "total": len(solution_list)
-            }
-        }
-        
-        # Calculate total time
-        total_time = time.time() - pipeline_start
-        
-        print("\n✅ Pipeline complete!")
-        print(f"⏱️  Total pipeline time: {total_time:.1f} seconds")
-        print("="*70)
+                response[stage] = data
         
         return jsonify(response)
         
     except Exception as e:
-        print(f"❌ Error in pipeline: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Error in pipeline: %s", e)
         return jsonify({
             "error": "Pipeline failed",
             "message": str(e),
@@ -281,6 +499,29 @@ def run_full_pipeline():
         }), 500
 
 
+@app.route('/api/diagnose/stream', methods=['POST'])
+def stream_full_pipeline():
+    """
+    Endpoint 2b: Same pipeline as /api/diagnose, streamed as NDJSON
+    One {"stage": ..., ...} line per step as soon as it finishes, so the
+    monitor data arrives long before the diagnosis and solutions
+    """
+    def generate():
+        try:
+            for stage, data in _pipeline_stages():
+                yield app.json.dumps({"stage": stage, **data}) + "\n"
+        except Exception as e:
+            log.exception("❌ Error in streamed pipeline: %s", e)
+            yield app.json.dumps({
+                "stage": "error",
+                "error": "Pipeline failed",
+                "message": str(e),
+                "pipeline_complete": False
+            }) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/fix', methods=['POST'])
 def get_solutions():
     """
@@ -308,7 +549,7 @@ def get_solutions():
         return jsonify(response)
         
     except Exception as e:
-        print(f"❌ Error in /api/fix: {e}")
+        log.exception("❌ Error in /api/fix: %s", e)
         return jsonify({
             "issue": "Solution Error",
             "root_cause": f"Failed to generate solutions: {str(e)}",
@@ -316,13 +557,21 @@ def get_solutions():
         }), 500
 
 
+@app.route('/api/fix/clear_cache', methods=['POST'])
+def clear_solution_cache():
+    """Forget memoized solutions, e.g. after switching the LLM model"""
+    cleared = _cached_solutions.cache_info().currsize
+    _cached_solutions.cache_clear()
+    return jsonify({"cleared": cleared})
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
     return jsonify({
         "status": "running",
         "monitor_available": monitor is not None,
-        "diagnostic_available": llm is not None,  # Diagnostic created per request
+        "diagnostic_available": llm is not None,  # Diagnostic agents pooled, created on demand
         "llm_available": llm is not None,
         "timestamp": datetime.now().isoformat()
     })
@@ -337,12 +586,15 @@ if __name__ == '__main__':
     print("🚀 Starting Flask API Server")
     print("="*70)
     print(f"Monitor Agent: {'✅ Ready' if monitor else '❌ Not available'}")
-    print(f"Diagnostic Agent: ✅ Created per request (fresh)")
+    print(f"Diagnostic Agent: ✅ Pooled (created on demand, reused)")
+    print(f"Solution Agent: {'✅ Ready' if solution_agent else '❌ Not available'}")
     print(f"LLM: {'✅ Connected' if llm else '❌ Not available'}")
     print("\nEndpoints:")
     print("  GET  /api/monitor   - Get current network status (continuous)")
     print("  POST /api/diagnose  - Run FULL PIPELINE (Monitor→Diagnostic→Solution)")
+    print("  POST /api/diagnose/stream - Same pipeline, one NDJSON line per step")
     print("  POST /api/fix       - Get solutions only (legacy)")
+    print("  POST /api/fix/clear_cache - Forget cached AI solutions")
     print("  GET  /api/health    - Check API health")
     print("="*70 + "\n")
     
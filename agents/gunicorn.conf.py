@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for the Flask API - picked up automatically when gunicorn
+is started from this directory:
+
+    cd agents
+    gunicorn wsgi:application
+"""
+
+bind = '0.0.0.0:5000'
+
+# Threaded workers; kept few since each worker has its own monitor/diagnosis
+# caches and probes the network on its own
+worker_class = 'gthread'
+workers = 2
+threads = 4
+
+# Import the agents once before forking so workers share them copy-on-write
+preload_app = True
+
+# The frontend polls /api/monitor every few seconds - hold idle connections
+# open that long instead of a new TCP handshake per poll. gunicorn already
+# sets TCP_NODELAY on its listening sockets, so small JSON responses aren't
+# held back by Nagle's algorithm
+keepalive = 30
+
+# /api/diagnose runs the tools plus the LLM, well past the 30s default
+timeout = 120
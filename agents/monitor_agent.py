@@ -24,6 +24,26 @@ except ImportError as e:
     print("Install with: pip install icmplib psutil dnspython netifaces crewai")
     exit(1)
 
+# Optional fast JSON encoder - tool results are serialized on every check
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(data) -> str:
+    """Serialize data to a compact JSON string"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _loads(text: str):
+    """Parse a JSON string"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
 
 # ============================================================================
 # TOOLS - Lightweight network monitoring functions
@@ -48,9 +68,9 @@ def ping_test(host: str = "8.8.8.8") -> str:
             'packet_loss': result.packet_loss,
             'host': host
         }
-        return json.dumps(data)
+        return _dumps(data)
     except Exception as e:
-        return json.dumps({
+        return _dumps({
             'success': False,
             'error': str(e),
             'host': host
@@ -78,7 +98,7 @@ def dns_lookup(domain: str = "google.com") -> str:
         answers = resolver.resolve(domain, 'A')
         latency_ms = (time.time() - start) * 1000
         
-        return json.dumps({
+        return _dumps({
             'success': True,
             'latency_ms': round(latency_ms, 2),
             'ip': str(answers[0]),
@@ -86,7 +106,7 @@ def dns_lookup(domain: str = "google.com") -> str:
         })
     except Exception as e:
         # Handle DNS failures (including no nameservers when offline)
-        return json.dumps({
+        return _dumps({
             'success': False,
             'error': str(e),
             'domain': domain,
@@ -131,20 +151,20 @@ def check_wifi_signal(interface: str = "wlan0") -> str:
                 else:
                     quality = "very weak"
                 
-                return json.dumps({
+                return _dumps({
                     'success': True,
                     'signal_dbm': signal_dbm,
                     'quality': quality,
                     'interface': interface
                 })
         
-        return json.dumps({
+        return _dumps({
             'success': False,
             'error': 'Signal level not found in iwconfig output',
             'interface': interface
         })
     except Exception as e:
-        return json.dumps({
+        return _dumps({
             'success': False,
             'error': str(e),
             'interface': interface
@@ -171,9 +191,9 @@ def check_interface_status(interface: str = "wlan0") -> str:
         iface_stats = io_counters.get(interface)
         
         if not iface_stats:
-            return json.dumps({'up': False, 'interface': interface})
+            return _dumps({'up': False, 'interface': interface})
         
-        return json.dumps({
+        return _dumps({
             'up': True,
             'interface': interface,
             'bytes_sent': iface_stats.bytes_sent,
@@ -186,7 +206,7 @@ def check_interface_status(interface: str = "wlan0") -> str:
             'drops_out': iface_stats.dropout
         })
     except Exception as e:
-        return json.dumps({
+        return _dumps({
             'up': False,
             'error': str(e),
             'interface': interface
@@ -210,18 +230,18 @@ def get_network_gateway(interface: str = "wlan0") -> str:
         
         if default_gateway:
             gateway_ip, gateway_interface = default_gateway
-            return json.dumps({
+            return _dumps({
                 'success': True,
                 'gateway_ip': gateway_ip,
                 'interface': gateway_interface
             })
         
-        return json.dumps({
+        return _dumps({
             'success': False,
             'error': 'No default gateway found'
         })
     except Exception as e:
-        return json.dumps({
+        return _dumps({
             'success': False,
             'error': str(e)
         })
@@ -291,11 +311,11 @@ class NetworkMonitor:
         print(f"\n🔍 Collecting metrics at {datetime.now().strftime('%H:%M:%S')}")
         
         # Use the tools directly (not through agent for speed)
-        ping_result = json.loads(ping_test.func())
-        dns_result = json.loads(dns_lookup.func())
-        signal_result = json.loads(check_wifi_signal.func(self.interface))
-        interface_result = json.loads(check_interface_status.func(self.interface))
-        gateway_result = json.loads(get_network_gateway.func(self.interface))
+        ping_result = _loads(ping_test.func())
+        dns_result = _loads(dns_lookup.func())
+        signal_result = _loads(check_wifi_signal.func(self.interface))
+        interface_result = _loads(check_interface_status.func(self.interface))
+        gateway_result = _loads(get_network_gateway.func(self.interface))
         
         metrics = {
             'timestamp': datetime.now().isoformat(),
@@ -413,15 +433,14 @@ class NetworkMonitor:
         Returns:
             CrewAI Task
         """
+        # One compact JSON object keeps the prompt (and token count) small
+        metrics_summary = {key: metrics[key] for key in ('ping', 'dns', 'signal', 'interface', 'gateway')}
+        
         return Task(
             description=f"""Analyze the following network metrics and provide a health assessment:
 
 Metrics collected at {metrics['timestamp']}:
-- Ping: {json.dumps(metrics['ping'], indent=2)}
-- DNS: {json.dumps(metrics['dns'], indent=2)}
-- WiFi Signal: {json.dumps(metrics['signal'], indent=2)}
-- Interface: {json.dumps(metrics['interface'], indent=2)}
-- Gateway: {json.dumps(metrics['gateway'], indent=2)}
+{_dumps(metrics_summary)}
 
 Provide:
 1. Overall health status (healthy/degraded/unhealthy)
@@ -21,7 +21,9 @@ llm = LLM(
     model='ollama/qwen2.5:0.5b',
     base_url='http://localhost:11434',
     temperature=0.3,  # Lower = faster, more focused
-    # max_tokens=100    # Limit response length for speed
+    max_tokens=256,     # Cap generation - answers are a short numbered list
+    num_ctx=1024,       # Prompts are a few hundred tokens; smaller KV cache than the default
+    keep_alive='30m'    # Keep the model loaded in Ollama between requests
 )
 monitor = NetworkMonitor(llm, interface='wlan0')
 
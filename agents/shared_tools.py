@@ -110,6 +110,49 @@ class NetworkTools:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _read_proc_arp() -> List[Dict]:
+        """Read the kernel ARP table from /proc/net/arp (no fork/exec)"""
+        with open('/proc/net/arp', 'r') as f:
+            lines = f.read().splitlines()[1:]  # Skip header
+        
+        devices = []
+        for line in lines:
+            # IP address, HW type, Flags, HW address, Mask, Device
+            parts = line.split()
+            if len(parts) == 6 and parts[3] != '00:00:00:00:00:00':  # skip incomplete
+                devices.append({
+                    "ip": parts[0],
+                    "mac": parts[3],
+                    "vendor": "unknown"
+                })
+        return devices
+    
+    @staticmethod
+    def _run_arp_command() -> List[Dict]:
+        """Parse `arp -a` output"""
+        result = subprocess.run(
+            ["arp", "-a"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        
+        devices = []
+        for line in result.stdout.split('\n'):
+            # Parse arp output
+            if '(' in line and ')' in line:
+                parts = line.split()
+                if len(parts) >= 4:
+                    ip = parts[1].strip('()')
+                    mac = parts[3] if len(parts) > 3 else "unknown"
+                    devices.append({
+                        "ip": ip,
+                        "mac": mac,
+                        "vendor": "unknown"
+                    })
+        return devices
+    
     @staticmethod
     def scan_connected_devices(interface: str = "wlan0") -> Dict:
         """
@@ -152,26 +195,11 @@ class NetworkTools:
         except FileNotFoundError:
             # Fallback to arp table
             try:
-                result = subprocess.run(
-                    ["arp", "-a"],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                
-                devices = []
-                for line in result.stdout.split('\n'):
-                    # Parse arp output
-                    if '(' in line and ')' in line:
-                        parts = line.split()
-                        if len(parts) >= 4:
-                            ip = parts[1].strip('()')
-                            mac = parts[3] if len(parts) > 3 else "unknown"
-                            devices.append({
-                                "ip": ip,
-                                "mac": mac,
-                                "vendor": "unknown"
-                            })
+                try:
+                    devices = NetworkTools._read_proc_arp()
+                except OSError:
+                    # No procfs - ask the arp binary instead
+                    devices = NetworkTools._run_arp_command()
                 
                 return {
                     "timestamp": datetime.now().isoformat(),
@@ -4,6 +4,7 @@ Uses LLM to generate creative, context-aware solutions based on diagnostic resul
 """
 
 import json
+import functools
 from datetime import datetime
 from typing import Dict, List
 
@@ -282,6 +283,78 @@ def estimate_resolution_time(solution: str) -> str:
         })
 
 
+# Simplified task for small LLMs - {root_cause}, {common_solutions} and
+# {recs_text} are filled in per diagnosis by CrewAI input interpolation
+SOLUTION_TASK_PROMPT = """Network problem: {root_cause}
+
+Here are common solutions for this issue:
+{common_solutions}
+
+Diagnostic recommendations:
+{recs_text}
+
+YOUR TASK: List 5 specific actions to fix this, in priority order.
+Start with quickest/easiest fixes first.
+
+Format your answer as:
+1. [Action with brief explanation]
+2. [Action with brief explanation]
+3. [Action with brief explanation]
+4. [Action with brief explanation]
+5. [Action with brief explanation]
+
+Be specific and actionable. Keep each item to one sentence."""
+
+
+# Common solutions fed into the task prompt, keyed by diagnosed issue type
+SOLUTION_TEMPLATES = {
+    'high_local_network_latency': """
+  - Restart router (unplug 30 seconds, plug back in)
+  - Move closer to WiFi router
+  - Check how many devices are connected
+  - Switch to 5GHz WiFi band if available
+  - Update router firmware""",
+    'high_external_latency': """
+  - Test with ethernet cable to rule out WiFi
+  - Restart modem and router
+  - Contact ISP about latency issues
+  - Check ISP status page for outages
+  - Try different DNS servers (8.8.8.8)""",
+    'moderate_network_degradation': """
+  - Move closer to WiFi router
+  - Restart WiFi adapter
+  - Switch to less congested WiFi channel
+  - Remove obstacles between you and router
+  - Use 5GHz instead of 2.4GHz""",
+    'weak_wifi_signal': """
+  - Move closer to router immediately
+  - Ensure router antennas are upright
+  - Reposition router to central location
+  - Switch to 2.4GHz for better range
+  - Remove metal objects blocking signal"""
+}
+
+DEFAULT_SOLUTION_TEMPLATE = """
+  - Restart router and modem
+  - Test with ethernet cable
+  - Check WiFi signal strength
+  - Update router firmware
+  - Contact ISP support"""
+
+# Template keys with underscores removed, for the loose issue-type match
+_TEMPLATE_MATCH_KEYS = tuple((key.replace('_', ''), template) for key, template in SOLUTION_TEMPLATES.items())
+
+
+@functools.lru_cache(maxsize=64)
+def _solution_template(issue_type: str) -> str:
+    """Common solutions for an issue type - issue types repeat, so the match is memoized"""
+    issue_lower = issue_type.lower().replace('_', '')
+    for key, template in _TEMPLATE_MATCH_KEYS:
+        if key in issue_lower or issue_lower in key:
+            return template
+    return DEFAULT_SOLUTION_TEMPLATE
+
+
 # ============================================================================
 # SOLUTION AGENT CLASS
 # ============================================================================
@@ -313,94 +386,47 @@ class SolutionAgent:
             max_iter=1  # Only one iteration for speed
         )
         
+        # Build the task and crew once; each diagnosis only fills in the
+        # {placeholders} through kickoff(inputs=...)
+        self.task = Task(
+            description=SOLUTION_TASK_PROMPT,
+            agent=self.agent,
+            expected_output="A numbered list of 5 specific actions to fix the network issue"
+        )
+        self.crew = Crew(
+            agents=[self.agent],
+            tasks=[self.task],
+            verbose=True
+        )
+        
         print(f"✅ AI Solution Agent initialized with LLM: {llm.model}")
     
     def _get_solution_template(self, issue_type: str) -> str:
         """Get common solutions as text (no tools needed)"""
-        templates = {
-            'high_local_network_latency': """
-  - Restart router (unplug 30 seconds, plug back in)
-  - Move closer to WiFi router
-  - Check how many devices are connected
-  - Switch to 5GHz WiFi band if available
-  - Update router firmware""",
-            'high_external_latency': """
-  - Test with ethernet cable to rule out WiFi
-  - Restart modem and router
-  - Contact ISP about latency issues
-  - Check ISP status page for outages
-  - Try different DNS servers (8.8.8.8)""",
-            'moderate_network_degradation': """
-  - Move closer to WiFi router
-  - Restart WiFi adapter
-  - Switch to less congested WiFi channel
-  - Remove obstacles between you and router
-  - Use 5GHz instead of 2.4GHz""",
-            'weak_wifi_signal': """
-  - Move closer to router immediately
-  - Ensure router antennas are upright
-  - Reposition router to central location
-  - Switch to 2.4GHz for better range
-  - Remove metal objects blocking signal"""
-        }
-        
-        # Match issue type
-        issue_lower = issue_type.lower().replace('_', '')
-        for key, template in templates.items():
-            if key.replace('_', '') in issue_lower or issue_lower in key.replace('_', ''):
-                return template
-        
-        # Default template
-        return """
-  - Restart router and modem
-  - Test with ethernet cable
-  - Check WiFi signal strength
-  - Update router firmware
-  - Contact ISP support"""
+        return _solution_template(issue_type)
     
-    def create_solution_task(self, diagnosis: Dict) -> Task:
+    def solution_inputs(self, diagnosis: Dict) -> Dict:
         """
-        Create a simplified task for small LLMs
+        Build the values interpolated into the shared solution task
         
         Args:
             diagnosis: Diagnosis dictionary from Diagnostic Agent
             
         Returns:
-            CrewAI Task
+            Inputs for crew.kickoff()
         """
-        primary_issue = diagnosis.get('primary_issue', 'unknown')
         root_cause = diagnosis.get('root_cause', 'Unknown cause')
         diagnostic_recs = diagnosis.get('recommendations', [])
         
         # Create simple recommendation list
         recs_text = "\n".join([f"  {i+1}. {r}" for i, r in enumerate(diagnostic_recs[:3])]) if diagnostic_recs else "  No specific recommendations"
         
-        # Get common solutions based on issue type
-        common_solutions = self._get_solution_template(primary_issue)
-        
-        return Task(
-            description=f"""Network problem: {root_cause}
-
-Here are common solutions for this issue:
-{common_solutions}
-
-Diagnostic recommendations:
-{recs_text}
-
-YOUR TASK: List 5 specific actions to fix this, in priority order.
-Start with quickest/easiest fixes first.
-
-Format your answer as:
-1. [Action with brief explanation]
-2. [Action with brief explanation]
-3. [Action with brief explanation]
-4. [Action with brief explanation]
-5. [Action with brief explanation]
-
-Be specific and actionable. Keep each item to one sentence.""",
-            agent=self.agent,
-            expected_output="A numbered list of 5 specific actions to fix the network issue"
-        )
+        return {
+            'root_cause': root_cause,
+            # Get common solutions based on issue type
+            'common_solutions': self._get_solution_template(diagnosis.get('primary_issue', 'unknown')),
+            'recs_text': recs_text
+        }
     
     def generate_solutions(self, diagnosis: Dict) -> Dict:
         """
@@ -438,16 +464,6 @@ Be specific and actionable. Keep each item to one sentence.""",
                 'llm_model': self.llm.model
             }
         
-        # Create task
-        task = self.create_solution_task(diagnosis)
-        
-        # Create crew with just the solution agent
-        crew = Crew(
-            agents=[self.agent],
-            tasks=[task],
-            verbose=True
-        )
-        
         # Execute the crew with progress indicator
         print("\n🤖 Engaging AI Solution Agent...")
         
@@ -468,7 +484,7 @@ Be specific and actionable. Keep each item to one sentence.""",
         progress_thread.start()
         
         try:
-            result = crew.kickoff()
+            result = self.crew.kickoff(inputs=self.solution_inputs(diagnosis))
         finally:
             # Stop progress indicator
             stop_progress.set()
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for running the Flask API under a production server
+
+    cd agents
+    gunicorn wsgi:application
+
+Worker, keep-alive and timeout settings are in gunicorn.conf.py, which
+gunicorn loads from the current directory. `python flask_api.py` still runs
+the development server.
+"""
+
+from flask_api import app
+
+application = app